@@ -0,0 +1,101 @@
+"""
+fake_bot_api.py - Local stand-in for the Telegram Bot API
+
+Answers the methods the bot uses with plausible results, records every call,
+and can inject latency and 429 Too Many Requests responses.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "BenchBot", "username": "bench_bot"}
+
+
+class FakeBotApi:
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0, retry_after: int = 1, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.throttled = 0
+        self.sent = []            # (method, chat_id) of successful sends
+        self._message_ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._runner = None
+        self.port = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _params(self, request):
+        if not request.can_read_body:
+            return {}
+        form = await request.post()
+        params = {}
+        for key, value in form.items():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            params[key] = value
+        return params
+
+    def _message(self, params):
+        chat_id = params.get("chat_id", 0)
+        return {
+            "message_id": params.get("message_id") or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    async def _handle(self, request):
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls[method] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method not in ("getMe", "setWebhook", "deleteWebhook") and self._random.random() < self.error_rate:
+            self.throttled += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method in ("sendMessage", "sendDocument", "sendPhoto", "editMessageText"):
+            result = self._message(params)
+            self.sent.append((method, params.get("chat_id")))
+        elif method == "copyMessage":
+            result = {"message_id": next(self._message_ids)}
+            self.sent.append((method, params.get("chat_id")))
+        elif method == "sendMediaGroup":
+            result = [self._message(params)]
+            self.sent.append((method, params.get("chat_id")))
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
@@ -0,0 +1,187 @@
+"""
+read_models.py - ORM hydration vs. column projections on the hot reads
+
+    python -m bench.read_models --owners 200 --messages 200000 --calls 2000
+
+Runs each hot read both ways against a seeded database and prints one JSON
+result line: p50/p99 latency per call, bytes allocated at peak during a call
+and bytes retained per result (what a cache or caller keeps alive), tagged
+with the git commit like bench.run. The ORM side is the old full-row query,
+kept here as the baseline since production code only uses the projections.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import time
+import tracemalloc
+
+from bench.run import BENCH_ENV, git_commit, percentile
+
+
+async def orm_owner_by_telegram_id(telegram_id: str):
+    from sqlalchemy.future import select
+    from database import Owner, session_scope
+
+    async with session_scope() as session:
+        result = await session.execute(select(Owner).where(Owner.telegram_id == telegram_id))
+        return result.scalars().first()
+
+
+async def orm_messages_for_owner(owner_id: int, limit: int = 100):
+    from sqlalchemy.future import select
+    from database import MessageLog, session_scope
+
+    async with session_scope() as session:
+        result = await session.execute(
+            select(MessageLog)
+            .where(MessageLog.owner_id == owner_id)
+            .order_by(MessageLog.timestamp.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+
+async def orm_stream_messages(owner_id: int, batch_size: int = 1000):
+    from sqlalchemy.future import select
+    import database
+    from database import MessageLog
+
+    query = (
+        select(MessageLog)
+        .where(MessageLog.owner_id == owner_id)
+        .order_by(MessageLog.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async with database.SessionLocal() as session:
+        result = await session.stream_scalars(query)
+        async for msg in result:
+            yield msg
+
+
+def _cases(owners: int, rng):
+    import read_models
+    from bench.seed import OWNER_BASE
+
+    def telegram_id():
+        return str(OWNER_BASE + rng.randrange(owners))
+
+    def owner_id():
+        return rng.randrange(owners) + 1
+
+    async def orm_export(owner):
+        return [msg async for msg in orm_stream_messages(owner)]
+
+    async def projected_export(owner):
+        return [row async for row in read_models.stream_messages(owner)]
+
+    return {
+        "owner_lookup": (
+            lambda: orm_owner_by_telegram_id(telegram_id()),
+            lambda: read_models.owner_by_telegram_id(telegram_id()),
+        ),
+        "recent_messages": (
+            lambda: orm_messages_for_owner(owner_id(), limit=100),
+            lambda: read_models.messages_for_owner(owner_id(), limit=100),
+        ),
+        "export_stream": (
+            lambda: orm_export(owner_id()),
+            lambda: projected_export(owner_id()),
+        ),
+    }
+
+
+async def _latency(call, calls: int):
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def _allocations(call, calls: int):
+    """Peak bytes allocated while a call runs, and bytes still held by its results."""
+    kept = []
+    peaks = []
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        kept.append(await call())
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {
+        "peak_kb": round(percentile(peaks, 50) / 1024, 2),
+        "retained_bytes_per_call": round(retained / calls),
+    }
+
+
+async def run(args):
+    import database
+    from config import settings
+    from bench.seed import seed
+
+    await database.init_db(settings.DATABASE_URL)
+    if not args.skip_seed:
+        await seed(args.owners, args.messages, args.users, args.seed)
+
+    rng = random.Random(args.seed)
+    result = {"commit": git_commit()}
+    for name, (orm, projected) in _cases(args.owners, rng).items():
+        calls = args.calls if name != "export_stream" else max(1, args.calls // 100)
+        result[name] = {}
+        for label, call in (("orm", orm), ("projection", projected)):
+            await _latency(call, min(calls, 20))   # warm statement caches
+            stats = await _latency(call, calls)
+            stats.update(await _allocations(call, min(calls, args.alloc_calls)))
+            result[name][label] = stats
+        result[name]["retained_ratio"] = round(
+            result[name]["projection"]["retained_bytes_per_call"]
+            / max(1, result[name]["orm"]["retained_bytes_per_call"]), 3
+        )
+
+    await database.engine.dispose()
+    result["params"] = {
+        "owners": args.owners, "messages": args.messages, "calls": args.calls,
+        "database": settings.DATABASE_URL.split("://")[0],
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--owners", type=int, default=100)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--alloc-calls", type=int, default=200, help="calls traced for allocations (slower)")
+    parser.add_argument("--database-url", help="defaults to a local SQLite file")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="append the JSON result line to this file")
+    args = parser.parse_args()
+
+    os.environ.update(BENCH_ENV)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    result = json.dumps(asyncio.run(run(args)))
+    print(result)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.write(result + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+run.py - Load test / benchmark harness
+
+    python -m bench.run --scenario mixed --updates 5000 --owners 200 --messages 200000
+
+Runs the real handlers (as registered in main.py) against a fake Bot API and a
+seeded SQLite (or local Postgres) database, then prints one JSON result line:
+throughput, p50/p99 handler latency, DB queries per update and peak RSS, tagged
+with the git commit so runs can be compared across commits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+BENCH_ENV = {
+    "BOT_TOKEN": "123456:BENCHMARKTOKENBENCHMARKTOKENBENCH",
+    "DATABASE_URL": "sqlite+aiosqlite:///bench.db",
+    "WEBHOOK_URL": "",
+    "MAIN_BOT_WEBHOOK": "false",
+    "ADMIN_IDS": "[]",
+    # Measure the bot, not the anti-spam policy
+    "RATE_LIMIT_INTERVAL": "0.001",
+    "FREE_MODE_MESSAGE_LIMIT": "1000000000",
+    "FREE_MODE_START_HOUR": "0",
+    "FREE_MODE_END_HOUR": "24",
+}
+UNTHROTTLED_ENV = {"TELEGRAM_GLOBAL_RATE": "1000000", "TELEGRAM_CHAT_INTERVAL": "0"}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform != "darwin" else rss / (1024 * 1024)
+
+
+async def run(args):
+    from sqlalchemy import event
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder
+
+    import database
+    from config import settings
+    from main import post_init, post_shutdown, register_handlers, wrap_handlers
+    from services.media import albums
+    from services.message_buffer import message_buffer
+    from services.metrics import InstrumentedRequest
+    from services.persistence import DatabasePersistence
+    from services.update_processor import PerChatUpdateProcessor
+    from bench.fake_bot_api import FakeBotApi
+    from bench.scenarios import SCENARIOS
+    from bench.seed import seed
+
+    api = FakeBotApi(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed)
+    base = await api.start()
+
+    await database.init_db(settings.DATABASE_URL)
+    if not args.skip_seed:
+        await seed(args.owners, args.messages, args.users, args.seed)
+
+    queries = [0]
+    event.listen(database.engine.sync_engine, "before_cursor_execute", lambda *a: queries.__setitem__(0, queries[0] + 1))
+
+    application = (
+        ApplicationBuilder()
+        .token(settings.BOT_TOKEN)
+        .base_url(f"{base}/bot")
+        .base_file_url(f"{base}/file/bot")
+        .request(InstrumentedRequest(connection_pool_size=256))
+        .updater(None)
+        .concurrent_updates(PerChatUpdateProcessor(args.concurrency))
+        .persistence(DatabasePersistence("bench", settings.PERSISTENCE_INTERVAL))
+        .build()
+    )
+    register_handlers(application)
+    wrap_handlers(application)
+
+    await application.initialize()
+    await post_init(application)
+    await application.start()
+
+    rng = random.Random(args.seed)
+    latencies = []
+    result = {}
+
+    if args.scenario == "jobs":
+        from jobs.cleanup import delete_old_messages
+        from jobs.trialchecker import check_trial
+
+        context = SimpleNamespace(bot=application.bot)
+        queries[0] = 0
+        for name, job in (("check_trial", check_trial), ("delete_old_messages", delete_old_messages)):
+            started = time.perf_counter()
+            await job(context)
+            latencies.append(time.perf_counter() - started)
+            result[f"{name}_ms"] = round(latencies[-1] * 1000, 2)
+        updates = len(latencies)
+        elapsed = sum(latencies)
+    else:
+        stream = [Update.de_json(data, application.bot)
+                  for data in SCENARIOS[args.scenario](args.updates, args.owners, args.users, rng)]
+        processor = application.update_processor
+
+        async def handle(update):
+            # Handler latency: from the moment the update gets a processing slot
+            started = time.perf_counter()
+            await application.process_update(update)
+            latencies.append(time.perf_counter() - started)
+
+        async def timed(update):
+            await processor.process_update(update, handle(update))
+
+        queries[0] = 0
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(timed(update)) for update in stream]
+        await asyncio.gather(*tasks)
+        # Count album delivery and the write-behind flush as part of the work
+        while albums.pending or message_buffer.pending:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        updates = len(stream)
+
+    await application.stop()
+    await post_shutdown(application)
+    await application.shutdown()
+    await api.stop()
+
+    result.update({
+        "commit": git_commit(),
+        "scenario": args.scenario,
+        "updates": updates,
+        "elapsed_s": round(elapsed, 3),
+        "msgs_per_s": round(updates / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies, default=0) * 1000, 2),
+        },
+        "db_queries_per_update": round(queries[0] / updates, 2) if updates else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "api_calls": dict(api.calls),
+        "api_429": api.throttled,
+        "params": {
+            "owners": args.owners, "messages": args.messages, "users": args.users,
+            "concurrency": args.concurrency, "latency_ms": args.latency_ms,
+            "error_rate": args.error_rate, "database": settings.DATABASE_URL.split("://")[0],
+        },
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="mixed", choices=["user_messages", "owner_replies", "export", "media", "mixed", "jobs"])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--owners", type=int, default=100)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of sends answered with 429")
+    parser.add_argument("--database-url", help="defaults to a local SQLite file")
+    parser.add_argument("--telegram-limits", action="store_true", help="keep the real outbound rate limits")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="append the JSON result line to this file")
+    args = parser.parse_args()
+
+    os.environ.update(BENCH_ENV)
+    if not args.telegram_limits:
+        os.environ.update(UNTHROTTLED_ENV)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    result = json.dumps(asyncio.run(run(args)))
+    print(result)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.write(result + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+scenarios.py - Synthetic update streams
+
+Each scenario yields raw Bot API update dicts, in the order Telegram would
+deliver them, for the given number of steps.
+"""
+
+import itertools
+import random
+import time
+
+from bench.seed import OWNER_BASE, USER_BASE
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int):
+    return {"id": user_id, "is_bot": False, "first_name": f"U{user_id}"}
+
+
+def message(user_id: int, text: str, command: bool = False):
+    msg = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": f"U{user_id}"},
+        "from": _user(user_id),
+        "text": text,
+    }
+    if command:
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": next(_update_ids), "message": msg}
+
+
+def photo(user_id: int, caption: str = None, media_group_id: str = None):
+    update = message(user_id, "")
+    msg = update["message"]
+    del msg["text"]
+    n = msg["message_id"]
+    msg["photo"] = [{"file_id": f"AgAC-{n}-{size}", "file_unique_id": f"u{n}{size}", "width": size, "height": size}
+                    for size in (90, 320, 1280)]
+    if caption:
+        msg["caption"] = caption
+    if media_group_id:
+        msg["media_group_id"] = media_group_id
+    return update
+
+
+def callback(user_id: int, data: str):
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_message_ids)),
+            "from": _user(user_id),
+            "chat_instance": "bench",
+            "data": data,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "menu",
+            },
+        },
+    }
+
+
+def user_messages(steps: int, owners: int, users: int, rng: random.Random):
+    for n in range(steps):
+        yield message(USER_BASE + rng.randrange(users), f"hello {n} " + "x" * rng.randint(1, 200))
+
+
+def media(steps: int, owners: int, users: int, rng: random.Random):
+    n = 0
+    while n < steps:
+        user = USER_BASE + rng.randrange(users)
+        if rng.random() < 0.3:
+            # Album: its parts arrive back to back as separate updates
+            size = min(rng.randint(2, 5), steps - n)
+            for part in range(size):
+                yield photo(user, "album" if part == 0 else None, media_group_id=f"g{n}")
+            n += size
+        else:
+            yield photo(user, f"photo {n}")
+            n += 1
+
+
+def owner_replies(steps: int, owners: int, users: int, rng: random.Random):
+    for n in range(steps // 2):
+        # Owner 0 is the default owner of the main bot, so its trial is the one checked
+        owner = OWNER_BASE
+        yield callback(owner, f"reply_{USER_BASE + rng.randrange(users)}")
+        yield message(owner, f"answer {n}")
+
+
+def exports(steps: int, owners: int, users: int, rng: random.Random):
+    for _ in range(steps):
+        yield message(OWNER_BASE + rng.randrange(owners), "/export", command=True)
+
+
+def mixed(steps: int, owners: int, users: int, rng: random.Random):
+    streams = [
+        (0.80, user_messages(steps, owners, users, rng)),
+        (0.18, owner_replies(steps, owners, users, rng)),
+        (0.02, exports(steps, owners, users, rng)),
+    ]
+    for _ in range(steps):
+        pick = rng.random()
+        for weight, stream in streams:
+            if pick < weight:
+                yield next(stream)
+                break
+            pick -= weight
+
+
+SCENARIOS = {
+    "user_messages": user_messages,
+    "owner_replies": owner_replies,
+    "export": exports,
+    "media": media,
+    "mixed": mixed,
+}
@@ -0,0 +1,54 @@
+"""
+seed.py - Fill a benchmark database with synthetic owners and messages
+
+Owner telegram ids start at OWNER_BASE and user ids at USER_BASE, so scenarios
+can address seeded rows without reading them back.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+
+import database
+from database import Conversation, DailyActiveUser, MessageLog, Owner, OwnerDailyStats
+
+OWNER_BASE = 1_000_000
+USER_BASE = 5_000_000
+BATCH = 5000
+
+
+async def seed(owners: int, messages: int, users: int, seed: int = 0):
+    rng = random.Random(seed)
+    now = datetime.now()
+
+    async for db in database.get_db():
+        for model in (DailyActiveUser, OwnerDailyStats, Conversation, MessageLog, Owner):
+            await db.execute(delete(model))
+
+        await db.execute(insert(Owner), [
+            {
+                "id": i + 1,
+                "telegram_id": str(OWNER_BASE + i),
+                "business_name": f"Business {i}",
+                "category": rng.choice(["Tech", "Education", "Ecommerce", "Other"]),
+                "bio": "Synthetic owner for benchmarks. " * 8,
+                "subscription_plan": "trial",
+                # Spread trial ends from a week ago to four months ahead; owner 0 (the default) stays active
+                "trial_ends": now + timedelta(hours=120 * 24 if i == 0 else rng.randint(-7 * 24, 120 * 24)),
+                "subscribed": False,
+            }
+            for i in range(owners)
+        ])
+
+        for start in range(0, messages, BATCH):
+            await db.execute(insert(MessageLog), [
+                {
+                    "user_id": str(USER_BASE + rng.randrange(users)),
+                    "owner_id": rng.randrange(owners) + 1,
+                    "message": f"synthetic message {n} " + "lorem ipsum " * rng.randint(1, 20),
+                    "timestamp": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                }
+                for n in range(start, min(start + BATCH, messages))
+            ])
+        await db.commit()
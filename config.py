@@ -8,9 +8,97 @@ class Settings(BaseSettings):
     BOT_TOKEN: str
     ADMIN_IDS: List[int] = []
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 256  # set 0 behind pgbouncer in transaction mode
     TRIAL_MONTHS: int = 4
     AUTO_PAY_ENABLE: bool = True
 
+    # Mini-bot fleet (webhook mode, all owner bots in one process)
+    WEBHOOK_URL: str = ""
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: str = ""
+    FLEET_POOL_SIZE: int = 64
+    MAIN_BOT_WEBHOOK: bool = False   # serve the main bot from the same listener instead of polling
+
+    # Pooled Bot API client and token health checks
+    BOT_API_POOL_SIZE: int = 100
+    BOT_API_TIMEOUT: float = 10
+    BOT_API_RETRIES: int = 2
+    BOT_API_CACHE_TTL: int = 600
+    TOKEN_CHECK_INTERVAL: int = 6 * 3600
+    TOKEN_CHECK_CONCURRENCY: int = 10
+    TOKEN_CHECK_PAGE_SIZE: int = 200
+
+    # Seconds between writes of changed user/chat/conversation state
+    PERSISTENCE_INTERVAL: int = 10
+    # Keys per bot whose stored state is remembered; older ones are re-read or re-written
+    PERSISTENCE_CACHE_SIZE: int = 20000
+
+    # Updates processed in parallel (ordered within each chat)
+    CONCURRENT_UPDATES: int = 64
+
+    # Write-behind MessageLog ingestion
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_FLUSH_INTERVAL: float = 1.0
+    INGEST_QUEUE_SIZE: int = 10000
+
+    # In-process owner directory
+    OWNER_CACHE_SIZE: int = 10000
+    OWNER_CACHE_TTL: int = 300
+
+    # Free mode and anti-spam
+    FREE_MODE_MESSAGE_LIMIT: int = 2
+    FREE_MODE_START_HOUR: int = 9
+    FREE_MODE_END_HOUR: int = 23
+    RATE_LIMIT_INTERVAL: float = 4
+    RATE_LIMIT_BURST: int = 1
+    RATE_LIMIT_IDLE_TTL: int = 600
+    RATE_LIMIT_MAX_ENTRIES: int = 100000
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "database" (shared by all workers)
+
+    # Trial notification job
+    TRIAL_CHECK_INTERVAL: int = 3600
+    TRIAL_NOTIFY_CONCURRENCY: int = 8
+    TRIAL_NOTIFY_PAGE_SIZE: int = 500
+    TRIAL_EXPIRED_LOOKBACK_DAYS: int = 7
+
+    # Outbound send queue (rate is per bot)
+    TELEGRAM_GLOBAL_RATE: int = 30
+    TELEGRAM_CHAT_INTERVAL: float = 1.0
+    OUTBOX_WORKERS: int = 8
+    OUTBOX_MAX_RETRIES: int = 3
+
+    # Global broadcast
+    BROADCAST_CHUNK_SIZE: int = 500
+    BROADCAST_CONCURRENCY: int = 30
+    BROADCAST_REPORT_INTERVAL: int = 15
+
+    # Message retention
+    MESSAGE_RETENTION_DAYS: int = 72
+    RETENTION_BATCH_SIZE: int = 5000
+    RETENTION_BATCH_PAUSE: float = 0.5
+    RETENTION_RUN_HOUR: int = 4
+
+    # Media relay: seconds to wait for the rest of an album
+    ALBUM_WINDOW: float = 1.0
+
+    # Startup
+    WARMUP_CACHES: bool = True
+    WARMUP_OWNERS: int = 2000
+
+    # Metrics endpoint (Prometheus text); 0 disables it
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = 0
+
+    # Sharded mode: >1 runs one ingress process feeding this many worker processes
+    SHARD_WORKERS: int = 1
+    SHARD_SLOTS: int = 256
+    SHARD_SOCKET: str = "/tmp/connectprobot-shards.sock"
+
     class Config:
         env_file = ".env"
 
@@ -1,11 +1,18 @@
 """
 database.py - Async PostgreSQL with SQLAlchemy
 """
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, Text, ForeignKey, Index, or_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.sql import func
 from sqlalchemy.future import select
+from datetime import datetime
 
 Base = declarative_base()
 
@@ -18,40 +25,253 @@ class Owner(Base):
     category = Column(String)
     bio = Column(Text)
     subscription_plan = Column(String)
-    trial_ends = Column(DateTime, nullable=True)
+    trial_ends = Column(DateTime, nullable=True, index=True)
     subscribed = Column(Boolean, default=False)
     bot_token = Column(String, nullable=True)
+    token_revoked = Column(Boolean, default=False)
     created_at = Column(DateTime, default=func.now())
 
 class MessageLog(Base):
     __tablename__ = "message_logs"
     id = Column(Integer, primary_key=True)
-    user_id = Column(String)
+    user_id = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("owners.id"))
     message = Column(Text)
-    timestamp = Column(DateTime, default=func.now())
+    media_ref = Column(String, nullable=True)   # "photo:<file_id>", "location", ... for non-text messages
+    main_bot = Column(Boolean, nullable=True)   # received by the main bot (not a mini-bot), so it can reach the user
+    timestamp = Column(DateTime, default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_message_logs_owner_ts", "owner_id", "timestamp"),
+        Index("ix_message_logs_owner_user_ts", "owner_id", "user_id", "timestamp"),
+    )
+
+class Conversation(Base):
+    """One row per owner/user pair, maintained when messages are written."""
+    __tablename__ = "conversations"
+    owner_id = Column(Integer, ForeignKey("owners.id"), primary_key=True)
+    user_id = Column(String, primary_key=True)
+    last_message = Column(Text)
+    last_message_at = Column(DateTime)
+    unread_count = Column(Integer, nullable=False, default=0)
+    awaiting_since = Column(DateTime, nullable=True)   # first user message not yet replied to
+
+    __table_args__ = (
+        Index("ix_conversations_owner_last", "owner_id", "last_message_at"),
+    )
+
+class TrialNotification(Base):
+    """Ledger of trial notices already sent, one row per owner, kind and trial period."""
+    __tablename__ = "trial_notifications"
+    owner_id = Column(Integer, ForeignKey("owners.id"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    trial_ends = Column(DateTime, primary_key=True)
+    sent_at = Column(DateTime, default=func.now())
+
+class Broadcast(Base):
+    """Global announcement with a checkpoint so it resumes after a restart."""
+    __tablename__ = "broadcasts"
+    id = Column(Integer, primary_key=True)
+    audience = Column(String)          # "owners" or "users"
+    text = Column(Text)
+    admin_chat_id = Column(String)
+    status = Column(String, default="running", index=True)
+    last_key = Column(String, nullable=True)
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class BotState(Base):
+    """Persisted user/chat/conversation state, one compact JSON document per key."""
+    __tablename__ = "bot_state"
+    scope = Column(String, primary_key=True)   # e.g. "main:user", "mini12:chat", "main:conv:setup"
+    key = Column(String, primary_key=True)
+    data = Column(Text)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class MessageQuota(Base):
+    __tablename__ = "message_quotas"
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class OwnerDailyStats(Base):
+    """Per owner and day rollup, maintained at ingest; never purged."""
+    __tablename__ = "owner_daily_stats"
+    owner_id = Column(Integer, ForeignKey("owners.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    messages_in = Column(Integer, nullable=False, default=0)
+    messages_out = Column(Integer, nullable=False, default=0)
+    unique_users = Column(Integer, nullable=False, default=0)
+    replies_timed = Column(Integer, nullable=False, default=0)
+    reply_seconds_total = Column(Float, nullable=False, default=0)
+    reply_seconds_max = Column(Float, nullable=False, default=0)
+
+class DailyActiveUser(Base):
+    """Exact set of users who wrote to an owner on a day; kept as long as the messages."""
+    __tablename__ = "daily_active_users"
+    owner_id = Column(Integer, ForeignKey("owners.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    user_id = Column(String, primary_key=True)
 
 engine = None
 SessionLocal = None
 
+def engine_options(db_url: str):
+    from config import settings
+
+    if make_url(db_url).get_backend_name() != "postgresql":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "connect_args": {
+            # SQLAlchemy's prepared statement cache and asyncpg's own statement cache
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    }
+
 async def init_db(db_url: str):
     global engine, SessionLocal
-    engine = create_async_engine(db_url, echo=False)
+    if engine is not None:
+        return
+    engine = create_async_engine(db_url, echo=False, **engine_options(db_url))
     SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    from migrations import migrate
+    await migrate(engine)
+
+def upsert(model):
+    """Dialect-specific INSERT supporting on_conflict_do_update (Postgres, SQLite)."""
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(model)
 
-async def get_owner_by_telegram_id(telegram_id: str):
+async def get_db():
+    """Standalone session for background work; commits are up to the caller."""
     async with SessionLocal() as session:
-        result = await session.execute(
-            select(Owner).where(Owner.telegram_id == telegram_id)
-        )
-        return result.scalars().first()
+        yield session
+
+# --- Unit of work: one lazily opened session and transaction per update ---
+
+class UnitOfWork:
+    def __init__(self):
+        self.session = None
+        self.closed = False
+        self.in_use = 0   # session_scope blocks currently using the session
+        self._after_commit = []
+
+    def get_session(self):
+        if self.session is None:
+            self.session = SessionLocal()
+        return self.session
+
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
+
+    async def release(self):
+        """Commit what the update did so far and return the connection; later access opens a new session."""
+        if self.session is None or self.in_use:
+            return
+        session, self.session = self.session, None
+        try:
+            await session.commit()
+        finally:
+            await session.close()
+        await self._run_after_commit()
+
+    async def finish(self, failed: bool):
+        self.closed = True
+        if self.session is not None:
+            try:
+                if failed:
+                    await self.session.rollback()
+                else:
+                    await self.session.commit()
+            finally:
+                await self.session.close()
+        if not failed:
+            await self._run_after_commit()
+
+    async def _run_after_commit(self):
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
 
-async def get_messages_for_owner(owner_id: int):
+_current_uow = ContextVar("current_uow", default=None)
+
+def current_uow():
+    uow = _current_uow.get()
+    return None if uow is None or uow.closed else uow
+
+@asynccontextmanager
+async def session_scope():
+    """Session of the current update, or a short-lived one committed on exit."""
+    uow = current_uow()
+    if uow is not None:
+        uow.in_use += 1
+        try:
+            yield uow.get_session()
+        finally:
+            uow.in_use -= 1
+        return
     async with SessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+async def after_commit(callback):
+    """Run ``callback`` once the current update's transaction has committed (now if none)."""
+    uow = current_uow()
+    if uow is not None:
+        uow.after_commit(callback)
+        return
+    result = callback()
+    if inspect.isawaitable(result):
+        await result
+
+async def release_session():
+    """Commit and release the current update's session early.
+
+    Only for handlers whose database work is finished (and may stand on its
+    own) before slow I/O such as Telegram sends; everything else commits once
+    when the update ends.
+    """
+    uow = current_uow()
+    if uow is not None:
+        await uow.release()
+
+def unit_of_work(callback):
+    """Wrap a handler so everything it touches shares one session and commits once."""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        uow = UnitOfWork()
+        token = _current_uow.set(uow)
+        failed = True
+        try:
+            result = await callback(update, context)
+            failed = False
+            return result
+        finally:
+            _current_uow.reset(token)
+            await uow.finish(failed)
+    return wrapper
+
+async def get_active_bot_tokens():
+    async with session_scope() as session:
         result = await session.execute(
-            select(MessageLog).where(MessageLog.owner_id == owner_id)
+            select(Owner.id, Owner.bot_token).where(
+                Owner.bot_token.isnot(None),
+                Owner.token_revoked.isnot(True),
+                or_(Owner.subscribed.is_(True), Owner.trial_ends > datetime.now()),
+            )
         )
-        return result.scalars().all()
-        
\ No newline at end of file
+        return result.all()
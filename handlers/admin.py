@@ -0,0 +1,113 @@
+"""
+admin.py
+Handles:
+- Admin-only commands (settings.ADMIN_IDS)
+- Global broadcast to owners / users
+- /stats: handler latency, DB and Telegram metrics
+- /analytics [days]: message, user and reply-time rollups
+"""
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from config import settings
+from services.analytics import summary
+from services.broadcast import AUDIENCES, start_broadcast
+from services.metrics import metrics
+from services.outbox import outbox, reply
+
+
+def is_admin(user_id) -> bool:
+    return int(user_id) in settings.ADMIN_IDS
+
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        return
+
+    if len(context.args) < 2 or context.args[0] not in AUDIENCES:
+        await reply(update, "📣 Usage: /broadcast owners|users <message>")
+        return
+
+    audience = context.args[0]
+    text = update.message.text.split(None, 2)[2]
+    broadcast_id = await start_broadcast(context.bot, audience, text, update.effective_chat.id)
+    await reply(update, f"📣 Broadcast #{broadcast_id} started for {audience}.")
+
+
+def _ms(seconds: float) -> str:
+    return "∞" if seconds == float("inf") else f"{seconds * 1000:.0f}ms"
+
+
+def render_stats(limit: int = 10) -> str:
+    lines = ["📈 Stats (since start)", "", "Handlers (p50 / p99 / count / errors)"]
+    handlers = sorted(metrics.series("handler_latency_seconds").items(), key=lambda item: -item[1].total)
+    for labels, h in handlers[:limit]:
+        name = dict(labels)["handler"]
+        errors = metrics.counter_value("handler_errors_total", handler=name)
+        lines.append(f"• {name}: {_ms(h.quantile(0.5))} / {_ms(h.quantile(0.99))} / {h.count} / {errors}")
+
+    queries = list(metrics.series("db_queries_per_update").values())
+    updates = sum(h.count for h in queries)
+    if updates:
+        lines.append(f"\n🗄 DB queries per update: {sum(h.total for h in queries) / updates:.2f}")
+    statements = metrics.series("db_statement_seconds")
+    for labels, h in sorted(statements.items(), key=lambda item: -item[1].count):
+        lines.append(f"• {dict(labels)['verb']}: {h.count} × p99 {_ms(h.quantile(0.99))}")
+
+    jobs = metrics.series("job_duration_seconds")
+    if jobs:
+        lines.append("\n⏱ Jobs (p99 / runs / errors)")
+        for labels, h in sorted(jobs.items()):
+            name = dict(labels)["job"]
+            errors = metrics.counter_value("job_errors_total", job=name)
+            lines.append(f"• {name}: {_ms(h.quantile(0.99))} / {h.count} / {errors}")
+
+    calls = metrics.series("telegram_request_seconds")
+    throttled = sum(v for (n, _), v in metrics.counters.items() if n == "telegram_throttled_total")
+    lines.append(f"\n📨 Telegram ({throttled} × 429)")
+    for labels, h in sorted(calls.items(), key=lambda item: -item[1].count)[:limit]:
+        lines.append(f"• {dict(labels)['method']}: {h.count} × p50 {_ms(h.quantile(0.5))} p99 {_ms(h.quantile(0.99))}")
+
+    outbox_metrics = outbox.metrics()
+    counters = outbox_metrics["counters"]
+    queued = sum(outbox_metrics["queued"].values())
+    lines.append(f"\n📬 Outbox: {counters.get('sent', 0)} sent, {counters.get('failed', 0)} failed, "
+                 f"{counters.get('retry_after', 0)} flood waits, {queued} queued")
+    return "\n".join(lines)
+
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        return
+    await reply(update, render_stats())
+
+
+def render_analytics(report) -> str:
+    avg = report["avg_reply_seconds"]
+    unique = report["unique_users"]
+    lines = [
+        f"📊 Analytics, last {report['days']} days",
+        "",
+        f"📥 Messages in: {report['messages_in']}",
+        f"📤 Replies out: {report['messages_out']}",
+        f"👥 Unique users: {unique if unique is not None else 'n/a (older than retention)'}",
+        f"🏢 Active owners: {report['active_owners']}",
+        f"⏱ Avg reply time: {f'{avg / 60:.1f} min' if avg is not None else 'n/a'}",
+    ]
+    if report["daily"]:
+        lines.append("\nPer day (messages / users)")
+        for day, messages, users in report["daily"][-14:]:
+            lines.append(f"• {day:%d-%m}: {messages} / {users}")
+    if report["busiest"]:
+        lines.append("\nBusiest owners")
+        for name, messages in report["busiest"]:
+            lines.append(f"• {name}: {messages}")
+    return "\n".join(lines)
+
+
+async def analytics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        return
+    days = int(context.args[0]) if context.args and context.args[0].isdigit() else 7
+    report = await summary(max(1, min(days, 366)))
+    await reply(update, render_analytics(report))
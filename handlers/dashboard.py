@@ -0,0 +1,108 @@
+"""
+dashboard.py
+Handles:
+- /dashboard: owner inbox, newest conversations first
+- Paging through conversations and opening a thread
+"""
+
+from datetime import datetime
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+from database import release_session
+from read_models import latest_conversations, thread_page
+from services.inbox import mark_read, media_label
+from services.outbox import edit, reply
+from services.owner_cache import owner_cache
+
+PAGE_SIZE = 8
+THREAD_SIZE = 10
+CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+SNIPPET_LENGTH = 300
+MESSAGE_LIMIT = 4096
+
+
+def _snippet(message: str) -> str:
+    """One line of user text, shortened and escaped for Markdown."""
+    message = " ".join((message or "").split())
+    if len(message) > SNIPPET_LENGTH:
+        message = message[:SNIPPET_LENGTH - 1] + "…"
+    return escape_markdown(message)
+
+
+def _inbox_markup(conversations):
+    keyboard = []
+    for conv in conversations:
+        badge = f" · {conv.unread_count} new" if conv.unread_count else ""
+        keyboard.append([InlineKeyboardButton(f"💬 {conv.user_id}{badge}", callback_data=f"thread_{conv.user_id}")])
+    if len(conversations) == PAGE_SIZE:
+        last = conversations[-1]
+        cursor = f"{last.last_message_at.strftime(CURSOR_FORMAT)}_{last.user_id}"
+        keyboard.append([InlineKeyboardButton("Next ▶", callback_data=f"dash_{cursor}")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def _inbox_text(conversations):
+    if not conversations:
+        return "📭 *No conversations yet.*"
+    lines = ["📥 *Your Inbox*\n"]
+    for conv in conversations:
+        when = conv.last_message_at.strftime("%d-%m %H:%M") if conv.last_message_at else ""
+        lines.append(f"• `{conv.user_id}` ({when}): {_snippet(conv.last_message)}")
+    return "\n".join(lines)
+
+
+async def dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    owner = await owner_cache.by_telegram_id(str(update.effective_user.id))
+    if not owner:
+        await reply(update, "❌ Owner not found.")
+        return
+
+    conversations = await latest_conversations(owner.id, limit=PAGE_SIZE)
+    await reply(
+        update,
+        _inbox_text(conversations), reply_markup=_inbox_markup(conversations), parse_mode="Markdown"
+    )
+
+
+async def dashboard_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    owner = await owner_cache.by_telegram_id(str(update.effective_user.id))
+    if not owner:
+        return
+
+    stamp, user_id = query.data.replace("dash_", "", 1).split("_", 1)
+    before = (datetime.strptime(stamp, CURSOR_FORMAT), user_id)
+    conversations = await latest_conversations(owner.id, before=before, limit=PAGE_SIZE)
+    await edit(
+        query,
+        _inbox_text(conversations), reply_markup=_inbox_markup(conversations), parse_mode="Markdown"
+    )
+
+
+async def open_thread(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    owner = await owner_cache.by_telegram_id(str(update.effective_user.id))
+    if not owner:
+        return
+
+    user_id = query.data.replace("thread_", "", 1)
+    messages = await thread_page(owner.id, user_id, limit=THREAD_SIZE)
+    await mark_read(owner.id, user_id)
+    await release_session()
+
+    header = f"🧵 *Conversation with* `{user_id}`\n"
+    lines = []
+    size = len(header)
+    # Newest first until the message is full, then shown oldest first
+    for msg in messages:
+        line = f"{msg.timestamp.strftime('%d-%m %H:%M')}: {_snippet(msg.message or media_label(msg.media_ref))}"
+        size += len(line) + 1
+        if size > MESSAGE_LIMIT:
+            break
+        lines.append(line)
+    text = "\n".join([header, *reversed(lines)])
+    keyboard = [[InlineKeyboardButton("Reply", callback_data=f"reply_{user_id}")]]
+    await edit(query, text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
@@ -1,35 +1,140 @@
 """
-export.py - Export messages as JSON
+export.py - Export messages as gzipped NDJSON or CSV
+
+Usage: /export [csv] [from=YYYY-MM-DD] [to=YYYY-MM-DD] [user=<user id>]
+Rows are streamed from the database into a gzip file on disk, so memory stays
+flat however long the history is. Large exports are split into several parts.
 """
+import csv
+import gzip
+import io
 import json
-from database import get_owner_by_telegram_id, get_messages_for_owner
+import tempfile
+from datetime import datetime, timedelta
+from database import release_session
+from read_models import stream_messages
+from services.outbox import outbox, reply
+from services.owner_cache import owner_cache
 from telegram import Update
 from telegram.ext import ContextTypes
 
+# Telegram bots may upload up to 50 MB per document
+EXPORT_PART_LIMIT = 45 * 1024 * 1024
+CSV_FIELDS = ["user_id", "message", "media", "timestamp"]
+
+
+def parse_export_args(args):
+    options = {"format": "json", "since": None, "until": None, "user_id": None}
+    for arg in args:
+        key, _, value = arg.partition("=")
+        key = key.lower()
+        if not value and key in ("csv", "json"):
+            options["format"] = key
+        elif key == "from":
+            options["since"] = datetime.strptime(value, "%Y-%m-%d")
+        elif key == "to":
+            options["until"] = datetime.strptime(value, "%Y-%m-%d") + timedelta(days=1)
+        elif key == "user" and value:
+            options["user_id"] = value
+        else:
+            raise ValueError(arg)
+    return options
+
+
+class ExportWriter:
+    """Encodes rows into gzip parts on disk, rolling over at EXPORT_PART_LIMIT."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.extension = "csv.gz" if fmt == "csv" else "ndjson.gz"
+        self.rows = 0
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line)
+        self._raw = None
+        self._gz = None
+        self._open()
+
+    def _open(self):
+        self._raw = tempfile.TemporaryFile()
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        if self.fmt == "csv":
+            self._csv.writerow(CSV_FIELDS)
+            self._emit()
+
+    def _emit(self):
+        self._gz.write(self._line.getvalue().encode("utf-8"))
+        self._line.seek(0)
+        self._line.truncate()
+
+    def write(self, msg) -> bool:
+        """Write one MessageLog row. Returns True when the current part is full."""
+        timestamp = msg.timestamp.isoformat() if msg.timestamp else None
+        if self.fmt == "csv":
+            self._csv.writerow([msg.user_id, msg.message, msg.media_ref, timestamp])
+        else:
+            self._line.write(json.dumps(
+                {"user_id": msg.user_id, "message": msg.message, "media": msg.media_ref, "timestamp": timestamp},
+                ensure_ascii=False,
+            ))
+            self._line.write("\n")
+        self._emit()
+        self.rows += 1
+        return self._raw.tell() >= EXPORT_PART_LIMIT
+
+    def finish_part(self):
+        """Close the current part and return its file, rewound for upload."""
+        self._gz.close()
+        raw = self._raw
+        raw.seek(0)
+        return raw
+
+    def next_part(self):
+        self._open()
+
+
+async def _send_part(update: Update, raw, part: int, extension: str, caption: str):
+    with raw:
+        data = raw.read()
+    # Bytes, not the file: a RetryAfter retry would otherwise upload from EOF
+    await outbox.send(
+        update.get_bot().send_document,
+        update.effective_chat.id,
+        document=data,
+        filename=f"ChatExport_ConnectsProBot_part{part}.{extension}",
+        caption=caption,
+    )
+
+
 async def export_json(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_chat.id)
-    
-    owner = await get_owner_by_telegram_id(user_id)
+
+    owner = await owner_cache.by_telegram_id(user_id)
     if not owner:
-        await update.message.reply_text("❌ Owner not found.")
+        await reply(update, "❌ Owner not found.")
         return
-    
-    messages = await get_messages_for_owner(owner.id)
-    
-    export_data = [
-        {
-            "user_id": msg.user_id,
-            "message": msg.message,
-            "timestamp": msg.timestamp.isoformat()
-        }
-        for msg in messages
-    ]
-
-    json_data = json.dumps(export_data, indent=4)
-
-    await update.message.reply_document(
-        document=json_data.encode("utf-8"),
-        filename="ChatExport_ConnectsProBot.json",
-        caption="📁 Here is your chat export."
+
+    try:
+        options = parse_export_args(context.args or [])
+    except ValueError:
+        await reply(
+            update,
+            "❌ Usage: /export [csv] [from=YYYY-MM-DD] [to=YYYY-MM-DD] [user=<user id>]"
+        )
+        return
+
+    # Uploads can take minutes; the stream below uses its own session
+    await release_session()
+    writer = ExportWriter(options["format"])
+    part = 1
+
+    messages = stream_messages(
+        owner.id, since=options["since"], until=options["until"], user_id=options["user_id"]
     )
-    
\ No newline at end of file
+    async for msg in messages:
+        if writer.write(msg):
+            await _send_part(update, writer.finish_part(), part, writer.extension, f"📁 Chat export — part {part}")
+            writer.next_part()
+            part += 1
+
+    caption = "📁 Here is your chat export." if part == 1 else f"📁 Chat export — part {part} (last)"
+    await _send_part(update, writer.finish_part(), part, writer.extension, caption)
@@ -1,14 +1,25 @@
 """
 lang.py
-Multi-language future setup
+Language selection: English / Hindi
 """
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
+from services.i18n import catalog, set_locale, CATALOGS, KEYBOARDS
+from services.outbox import edit, reply
+
 
 async def language_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [
-        [InlineKeyboardButton("🇺🇸 English", callback_data="lang_en")],
-        [InlineKeyboardButton("🇮🇳 Hindi", callback_data="lang_hi")],
-    ]
-    await update.message.reply_text("🌐 Choose Language", reply_markup=InlineKeyboardMarkup(keyboard))
\ No newline at end of file
+    t, keyboards = catalog(update, context)
+    await reply(update, t["choose_language"], reply_markup=keyboards["language"])
+
+
+async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    locale = query.data.replace("lang_", "", 1)
+    if locale not in CATALOGS:
+        return
+    set_locale(context.bot.id, update.effective_user.id, locale, context.user_data)
+    await edit(query, CATALOGS[locale]["language_set"], reply_markup=KEYBOARDS[locale]["main_menu"])
@@ -4,36 +4,43 @@ Handles:
 - Main Menu UI
 - About Page
 - Settings Button (future gateway)
+Texts and keyboards come prebuilt per locale from services.i18n.
 """
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
-from config import settings
+from services.i18n import catalog, KEYBOARDS, DEFAULT_LOCALE
+from services.outbox import edit, reply
+from services.owner_cache import owner_cache
 
 
-def main_menu_keyboard():
-    keyboard = [
-        [InlineKeyboardButton("💬 Message Admin", callback_data="msg_admin")],
-        [InlineKeyboardButton("ℹ About Us", callback_data="about")],
-        [InlineKeyboardButton("⚙ Settings", callback_data="settings")],
-    ]
-    return InlineKeyboardMarkup(keyboard)
+def main_menu_keyboard(locale: str = DEFAULT_LOCALE):
+    return KEYBOARDS[locale]["main_menu"]
 
 
 async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t, keyboards = catalog(update, context)
+
     if update.callback_query:
         query = update.callback_query
         await query.answer()
         user = query.message.chat
-        await query.edit_message_text(
-            f"👋 **Hello {user.first_name}!**\nWelcome to your bot!",
-            reply_markup=main_menu_keyboard()
+        await edit(
+            query,
+            t["greeting"].format(name=user.first_name),
+            reply_markup=keyboards["main_menu"]
         )
     else:
+        # Deep link t.me/<bot>?start=<owner id> routes this user's messages to that owner
+        if context.args:
+            owner = await owner_cache.by_start_param(context.args[0])
+            if owner:
+                context.user_data["owner_id"] = owner.id
         user = update.message.chat
-        await update.message.reply_text(
-            f"👋 **Hello {user.first_name}!**\nWelcome to your bot!",
-            reply_markup=main_menu_keyboard()
+        await reply(
+            update,
+            t["greeting"].format(name=user.first_name),
+            reply_markup=keyboards["main_menu"]
         )
 
 
@@ -41,34 +48,13 @@ async def about_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    text = (
-        f"📌 **About This Bot**\n\n"
-        f"This bot helps you manage your leads and respond quickly.\n"
-        f"💡 Auto reply system\n"
-        f"💡 Admin direct inbox system\n"
-        f"💡 Free Trial: {settings.TRIAL_MONTHS} Months\n\n"
-        f"Powered by ConnectsProBot Platform\n"
-        f"This Bot was made using @Connectsprobot"
-    )
-
-    await query.edit_message_text(text, reply_markup=main_menu_keyboard())
+    t, keyboards = catalog(update, context)
+    await edit(query, t["about"], reply_markup=keyboards["main_menu"])
 
 
 async def settings_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    keyboard = [
-        [InlineKeyboardButton("🌐 Add Payment Gateway (Coming Soon)", callback_data="none")],
-        [InlineKeyboardButton("🔙 Back to Menu", callback_data="back_menu")]
-    ]
-
-    await query.edit_message_text(
-        "⚙ **Settings & Controls**\n\n"
-        "Here you will control:\n"
-        "✔ Payments\n"
-        "✔ Subscription Upgrade\n"
-        "✔ Bot Customization\n\n"
-        "This Bot was made using @Connectsprobot",
-        reply_markup=InlineKeyboardMarkup(keyboard)
-    )
\ No newline at end of file
+    t, keyboards = catalog(update, context)
+    await edit(query, t["settings"], reply_markup=keyboards["settings"])
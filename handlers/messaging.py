@@ -1,59 +1,132 @@
 """
 messaging.py - Handle user messages and replies
+Text is re-sent; media is relayed by file_id (copy_message), albums as one media group.
 """
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from datetime import datetime
-from database import SessionLocal, MessageLog, Owner
-from sqlalchemy.future import select
+from services.analytics import record_reply
+from services.media import albums, album_key, media_ref, relay, relay_album
+from services.message_buffer import message_buffer
+from services.outbox import edit, outbox
+from services.owner_cache import owner_cache
+
+def continue_album(update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str) -> bool:
+    """True if this update is a later part of a ``kind`` ("user" or "reply") album already being collected."""
+    message = update.message
+    return bool(message and message.media_group_id and albums.extend(album_key(context.bot, message), message, kind))
+
+async def _log_message(context, user, owner, message):
+    await message_buffer.put(
+        user_id=str(user.id),
+        owner_id=owner.id if owner else None,
+        main_bot=not context.bot_data.get("owner_id"),
+        message=message.text or message.caption,
+        media_ref=media_ref(message),
+        timestamp=datetime.now(),
+    )
+
+async def _confirm_sent(bot, chat_id):
+    await outbox.send(
+        bot.send_message,
+        chat_id,
+        text="📨 *Your message has been sent.*\nThe admin will reply soon.",
+        parse_mode="Markdown"
+    )
 
 async def user_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
+    message = update.message
+    bot = context.bot
 
-    async with SessionLocal() as db:
-        msg = MessageLog(
-            user_id=str(user.id),
-            message=update.message.text,
-            timestamp=datetime.now(),
-        )
-        db.add(msg)
-        await db.commit()
+    # Mini-bots carry their owner, deep-linked users remember theirs, the rest go to the default owner
+    owner_id = context.bot_data.get("owner_id") or context.user_data.get("owner_id")
+    if owner_id:
+        owner = await owner_cache.by_id(owner_id)
+    else:
+        owner = await owner_cache.default_owner()
 
-    async with SessionLocal() as db:
-        result = await db.execute(select(Owner))
-        owner = result.scalars().first()
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("Reply", callback_data=f"reply_{user.id}")]])
 
-    if not owner:
+    if message.media_group_id:
+        async def deliver(messages):
+            for part in messages:
+                await _log_message(context, user, owner, part)
+            if owner:
+                await relay_album(bot, messages, int(owner.telegram_id), f"💬 Message from {user.full_name}")
+                # Media groups cannot carry a keyboard; the Reply button follows separately
+                await outbox.send(
+                    bot.send_message,
+                    int(owner.telegram_id),
+                    text=f"↩️ Reply to {user.full_name}",
+                    reply_markup=keyboard
+                )
+                await _confirm_sent(bot, message.chat_id)
+
+        albums.open(album_key(bot, message), message, deliver, "user")
         return
 
-    keyboard = [[InlineKeyboardButton("Reply", callback_data=f"reply_{user.id}")]]
+    await _log_message(context, user, owner, message)
 
-    await context.bot.send_message(
-        chat_id=int(owner.telegram_id),
-        text=f"💬 Message from *{user.full_name}*\n\n📩 {update.message.text}",
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode="Markdown"
-    )
+    if not owner:
+        return
+
+    if message.text:
+        await outbox.send(
+            bot.send_message,
+            int(owner.telegram_id),
+            text=f"💬 Message from *{user.full_name}*\n\n📩 {message.text}",
+            reply_markup=keyboard,
+            parse_mode="Markdown"
+        )
+    else:
+        await relay(bot, message, int(owner.telegram_id), f"💬 Message from {user.full_name}", keyboard)
 
-    await update.message.reply_text("📨 *Your message has been sent.*\nThe admin will reply soon.", parse_mode="Markdown")
+    await _confirm_sent(bot, update.effective_chat.id)
 
 async def reply_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     user_id = query.data.replace("reply_", "")
     context.user_data["reply_to"] = user_id
-    await query.edit_message_text("✍ *Send your reply:*", parse_mode="Markdown")
+    await edit(query, "✍ *Send your reply:*", parse_mode="Markdown")
 
 async def send_owner_reply(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    reply_msg = update.message.text
+    message = update.message
     user_id = context.user_data.get("reply_to")
+    bot = context.bot
 
     if user_id:
-        await context.bot.send_message(
-            chat_id=int(user_id),
-            text=f"📨 *Reply from Admin:*\n\n{reply_msg}",
-            parse_mode="Markdown"
-        )
-        await update.message.reply_text("✅ *Reply sent successfully.*", parse_mode="Markdown")
+        async def confirm():
+            await outbox.send(
+                bot.send_message,
+                message.chat_id,
+                text="✅ *Reply sent successfully.*",
+                parse_mode="Markdown"
+            )
+
+        if message.media_group_id:
+            async def deliver(messages):
+                await relay_album(bot, messages, int(user_id), "📨 Reply from Admin:")
+                await confirm()
+
+            albums.open(album_key(bot, message), message, deliver, "reply")
+        else:
+            if message.text:
+                await outbox.send(
+                    bot.send_message,
+                    int(user_id),
+                    text=f"📨 *Reply from Admin:*\n\n{message.text}",
+                    parse_mode="Markdown"
+                )
+            else:
+                await relay(bot, message, int(user_id), "📨 Reply from Admin:")
+            await confirm()
         context.user_data["reply_to"] = None
-        
\ No newline at end of file
+
+        owner_id = context.bot_data.get("owner_id")
+        if not owner_id:
+            owner = await owner_cache.by_telegram_id(str(update.effective_user.id))
+            owner_id = owner.id if owner else None
+        if owner_id:
+            await record_reply(owner_id, user_id)
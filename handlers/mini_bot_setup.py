@@ -9,10 +9,14 @@ Handles:
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from datetime import datetime, timedelta
-from database import get_db, Owner
+from database import session_scope, after_commit, Owner
 from sqlalchemy.future import select
-import aiohttp
+import re
 from config import settings
+from services.bot_api import bot_api
+from services.bot_fleet import fleet
+from services.outbox import edit, reply
+from services.owner_cache import owner_saved
 
 
 async def start_mini_bot_setup(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -20,7 +24,7 @@ async def start_mini_bot_setup(update: Update, context: ContextTypes.DEFAULT_TYP
     await query.answer()
 
     context.user_data["setup_type"] = "mini"
-    await query.edit_message_text("📝 Enter your **Business or Channel Name**:")
+    await edit(query, "📝 Enter your **Business or Channel Name**:")
     return "ASK_MB_NAME"
 
 
@@ -33,7 +37,8 @@ async def mb_save_business_name(update: Update, context: ContextTypes.DEFAULT_TY
         [InlineKeyboardButton("E-commerce", callback_data="mbcat_Ecommerce"),
          InlineKeyboardButton("Other", callback_data="mbcat_Other")],
     ]
-    await update.message.reply_text(
+    await reply(
+        update,
         "📂 Choose your **Category**", reply_markup=InlineKeyboardMarkup(keyboard)
     )
     return "ASK_MB_CATEGORY"
@@ -46,13 +51,14 @@ async def mb_save_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
     category = query.data.replace("mbcat_", "")
     context.user_data["category"] = category
 
-    await query.edit_message_text("✍ Add a short **Bio / Description**:")
+    await edit(query, "✍ Add a short **Bio / Description**:")
     return "ASK_MB_BIO"
 
 
 async def mb_save_bio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["bio"] = update.message.text
-    await update.message.reply_text(
+    await reply(
+        update,
         "🤖 Send your **Bot Token** (From @BotFather)\n\n"
         "**Steps:**\n"
         "1️⃣ Open @BotFather\n"
@@ -63,11 +69,19 @@ async def mb_save_bio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return "ASK_MB_TOKEN"
 
 
+TOKEN_PATTERN = re.compile(r"^\d+:[A-Za-z0-9_-]{30,}$")
+
+
 async def validate_bot_token(token: str):
-    url = f"https://api.telegram.org/bot{token}/getMe"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            return response.status == 200
+    if not TOKEN_PATTERN.match(token):
+        return False
+    return await bot_api.get_me(token) is not None
+
+
+async def _mini_bot_saved(owner):
+    await owner_saved(owner)
+    if fleet.running:
+        await fleet.add_bot(owner.id, owner.bot_token)
 
 
 async def mb_save_bot_token(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -75,13 +89,13 @@ async def mb_save_bot_token(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     valid = await validate_bot_token(bot_token)
     if not valid:
-        await update.message.reply_text("❌ Invalid Bot Token. Please send again.")
+        await reply(update, "❌ Invalid Bot Token. Please send again.")
         return "ASK_MB_TOKEN"
 
     # SAVE TO DB
     trial_end_date = datetime.now() + timedelta(days=settings.TRIAL_MONTHS * 30)
 
-    async for db in get_db():
+    async with session_scope() as db:
         owner = Owner(
             telegram_id=str(update.effective_user.id),
             business_name=context.user_data["business_name"],
@@ -93,9 +107,12 @@ async def mb_save_bot_token(update: Update, context: ContextTypes.DEFAULT_TYPE):
             subscribed=False
         )
         db.add(owner)
-        await db.commit()
+        await db.flush()
+
+    await after_commit(lambda: _mini_bot_saved(owner))
 
-    await update.message.reply_text(
+    await reply(
+        update,
         "🎉 **Your Mini Bot Has Been Successfully Linked!**\n\n"
         f"🆓 You are now in **Free Trial ({settings.TRIAL_MONTHS} Months)**\n"
         f"Trial Ends: `{trial_end_date.strftime('%d-%m-%Y')}`\n\n"
@@ -7,7 +7,9 @@ Handles:
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from database import get_db, Owner
+from database import session_scope, after_commit, Owner
+from services.outbox import edit, reply
+from services.owner_cache import owner_saved
 from sqlalchemy.future import select
 from datetime import datetime, timedelta
 
@@ -18,7 +20,7 @@ async def shared_bot_setup(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     context.user_data["setup_type"] = "shared"
-    await query.edit_message_text("📝 Enter your **Business or Channel Name**:")
+    await edit(query, "📝 Enter your **Business or Channel Name**:")
     return "ASK_NAME"
 
 
@@ -32,7 +34,8 @@ async def save_business_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
          InlineKeyboardButton("Other", callback_data="cat_Other")]
     ]
     
-    await update.message.reply_text(
+    await reply(
+        update,
         "📂 Choose your **Category**", reply_markup=InlineKeyboardMarkup(keyboard)
     )
     return "ASK_CATEGORY"
@@ -45,13 +48,13 @@ async def save_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
     category = query.data.replace("cat_", "")
     context.user_data["category"] = category
 
-    await query.edit_message_text("✍ Add a short **Bio / Description**:")
+    await edit(query, "✍ Add a short **Bio / Description**:")
     return "ASK_BIO"
 
 
 async def save_bio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["bio"] = update.message.text
-    await update.message.reply_text("📸 Upload Logo (optional) or type **Skip**")
+    await reply(update, "📸 Upload Logo (optional) or type **Skip**")
     return "ASK_LOGO"
 
 
@@ -62,7 +65,7 @@ async def save_logo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logo = update.message.photo[-1].file_id
 
     # Save Database
-    async for db in get_db():
+    async with session_scope() as db:
         owner = Owner(
             telegram_id=str(update.effective_user.id),
             business_name=context.user_data["business_name"],
@@ -74,9 +77,12 @@ async def save_logo(update: Update, context: ContextTypes.DEFAULT_TYPE):
             subscribed=False
         )
         db.add(owner)
-        await db.commit()
+        await db.flush()
 
-    await update.message.reply_text(
+    await after_commit(lambda: owner_saved(owner))
+
+    await reply(
+        update,
         "🎉 **Your Profile is Ready!**\n"
         "You can now receive messages and reply privately.\n\n"
         "**Plan:** Free Shared Bot (No Subscription Required)"
@@ -8,6 +8,7 @@ Handles:
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from services.outbox import edit, reply
 from database import get_db, Owner
 from config import settings
 from sqlalchemy.future import select
@@ -32,7 +33,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    await update.message.reply_text(INTRO_MESSAGE, reply_markup=reply_markup)
+    await reply(update, INTRO_MESSAGE, reply_markup=reply_markup)
 
 
 async def register_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -47,7 +48,8 @@ async def register_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
     ]
 
-    await query.edit_message_text(
+    await edit(
+        query,
         "**Select how you want to use ConnectProBot:**",
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
\ No newline at end of file
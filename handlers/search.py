@@ -0,0 +1,94 @@
+"""
+search.py
+Handles:
+- /search <words> [from=YYYY-MM-DD] [to=YYYY-MM-DD] [user=ID]
+- Ranked hits from the owner's own history, paged with Next / Prev buttons
+"""
+
+from datetime import datetime, timedelta
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from services.outbox import edit, reply
+from services.owner_cache import owner_cache
+from services.search import search_messages
+
+PAGE_SIZE = 8
+SNIPPET_LENGTH = 160
+USAGE = "🔎 Usage: /search <words> [from=YYYY-MM-DD] [to=YYYY-MM-DD] [user=ID]"
+
+
+def parse_search_args(args):
+    options = {"text": [], "since": None, "until": None, "user_id": None}
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        key = key.lower()
+        if sep and key == "from":
+            options["since"] = datetime.strptime(value, "%Y-%m-%d")
+        elif sep and key == "to":
+            options["until"] = datetime.strptime(value, "%Y-%m-%d") + timedelta(days=1)
+        elif sep and key == "user" and value:
+            options["user_id"] = value
+        else:
+            options["text"].append(arg)
+    options["text"] = " ".join(options["text"])
+    return options
+
+
+def _snippet(message: str) -> str:
+    message = " ".join((message or "").split())
+    return message if len(message) <= SNIPPET_LENGTH else message[:SNIPPET_LENGTH - 1] + "…"
+
+
+async def _render(owner_id: int, options, offset: int):
+    rows, has_more = await search_messages(
+        owner_id, options["text"], since=options["since"], until=options["until"],
+        user_id=options["user_id"], offset=offset, limit=PAGE_SIZE,
+    )
+    if not rows:
+        return f"🔎 No messages match “{options['text']}”.", None
+
+    lines = [f"🔎 Results for “{options['text']}” ({offset + 1}–{offset + len(rows)})\n"]
+    for row in rows:
+        lines.append(f"[{row.timestamp.strftime('%d-%m-%Y %H:%M')}] {row.user_id}: {_snippet(row.message)}")
+
+    buttons = []
+    if offset:
+        buttons.append(InlineKeyboardButton("◀ Prev", callback_data=f"srch_{max(0, offset - PAGE_SIZE)}"))
+    if has_more:
+        buttons.append(InlineKeyboardButton("Next ▶", callback_data=f"srch_{offset + PAGE_SIZE}"))
+    return "\n".join(lines), InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    owner = await owner_cache.by_telegram_id(str(update.effective_user.id))
+    if not owner:
+        await reply(update, "❌ Owner not found.")
+        return
+
+    try:
+        options = parse_search_args(context.args)
+    except ValueError:
+        await reply(update, USAGE)
+        return
+    if not options["text"]:
+        await reply(update, USAGE)
+        return
+
+    # Callback data is too small for the query itself; keep the raw args with the user
+    context.user_data["search"] = list(context.args)
+    text, markup = await _render(owner.id, options, 0)
+    await reply(update, text, reply_markup=markup)
+
+
+async def search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    owner = await owner_cache.by_telegram_id(str(update.effective_user.id))
+    args = context.user_data.get("search")
+    if not owner or not args:
+        return
+
+    options = parse_search_args(args)
+    offset = int(query.data.replace("srch_", "", 1))
+    text, markup = await _render(owner.id, options, offset)
+    await edit(query, text, reply_markup=markup)
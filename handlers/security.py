@@ -1,19 +1,49 @@
 """
 security.py
-Anti-spam protection: Prevent users from sending many msgs quickly
+Anti-spam protection:
+- Burst limit per user (token bucket, idle users are evicted)
+- Free mode: daily message quota and opening hours
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from config import settings
+from services.rate_limiter import TokenBucketLimiter, make_quota_backend
+
+burst_limiter = TokenBucketLimiter(
+    interval=settings.RATE_LIMIT_INTERVAL,
+    burst=settings.RATE_LIMIT_BURST,
+    idle_ttl=settings.RATE_LIMIT_IDLE_TTL,
+    max_entries=settings.RATE_LIMIT_MAX_ENTRIES,
+)
+quota_backend = make_quota_backend(settings.RATE_LIMIT_BACKEND)
 
-user_last_msg = {}
 
 def anti_spam(user_id):
-    global user_last_msg
-    now = datetime.now()
+    return burst_limiter.allow(user_id)
+
+
+def free_mode_open(now=None):
+    hour = (now or datetime.now()).hour
+    return settings.FREE_MODE_START_HOUR <= hour < settings.FREE_MODE_END_HOUR
 
-    if user_id in user_last_msg:
-        diff = now - user_last_msg[user_id]
-        if diff < timedelta(seconds=4):  # Spam limit 1 msg every 4 sec
-            return False
-    user_last_msg[user_id] = now
-    return True
\ No newline at end of file
+
+async def check_message(user_id, free_mode: bool):
+    """Return a refusal text for the user, or None if the message may pass."""
+    if not anti_spam(user_id):
+        return f"🚫 Slow down — Please wait {settings.RATE_LIMIT_INTERVAL:g} seconds."
+
+    if not free_mode:
+        return None
+
+    now = datetime.now()
+    if not free_mode_open(now):
+        return (
+            f"🌙 Free mode is open from {settings.FREE_MODE_START_HOUR}:00 "
+            f"to {settings.FREE_MODE_END_HOUR}:00."
+        )
+    if not await quota_backend.hit(str(user_id), now.date(), settings.FREE_MODE_MESSAGE_LIMIT):
+        return (
+            f"⏳ Daily limit reached ({settings.FREE_MODE_MESSAGE_LIMIT} messages in free mode).\n"
+            "Please try again tomorrow."
+        )
+    return None
@@ -1,12 +1,18 @@
 """
 trialstop.py - Check if trial is active
 """
-from database import get_owner_by_telegram_id
+from services.owner_cache import owner_cache
+from services.trial_index import trial_index, entitlement_expiry
 from datetime import datetime
 
 async def trial_active(owner_id):
-    owner = await get_owner_by_telegram_id(str(owner_id))
-    if not owner or not owner.trial_ends:
+    active = trial_index.is_active(str(owner_id))
+    if active is not None:
+        return active
+
+    # Index not loaded yet: fall back to the database
+    owner = await owner_cache.by_telegram_id(str(owner_id))
+    if not owner:
         return False
-    return datetime.now() < owner.trial_ends
-    
\ No newline at end of file
+    expires_at = entitlement_expiry(owner)
+    return expires_at is None or datetime.now() < expires_at
@@ -1,18 +1,53 @@
 """
-cleanup.py - Delete messages older than 72 days
+cleanup.py - Delete messages (and inbox previews) older than MESSAGE_RETENTION_DAYS
+Deletes in bounded batches over the indexed timestamp, pausing between batches
+so the purge never holds long locks or starves the bot of connections.
 """
-from database import SessionLocal, MessageLog
+import asyncio
+import logging
+from database import get_db, Conversation, MessageLog
 from datetime import datetime, timedelta
-from sqlalchemy import delete
+from sqlalchemy import delete, update
+from sqlalchemy.future import select
+from config import settings
+from handlers.security import quota_backend
+from services.analytics import purge_active_users
 
-async def delete_old_messages():
-    threshold_date = datetime.now() - timedelta(days=72)
-    
-    async with SessionLocal() as session:
-        await session.execute(
-            delete(MessageLog).where(MessageLog.timestamp < threshold_date)
+logger = logging.getLogger(__name__)
+
+
+async def delete_old_messages(context=None):
+    threshold_date = datetime.now() - timedelta(days=settings.MESSAGE_RETENTION_DAYS)
+    batch = (
+        select(MessageLog.id)
+        .where(MessageLog.timestamp < threshold_date)
+        .order_by(MessageLog.timestamp)
+        .limit(settings.RETENTION_BATCH_SIZE)
+        .scalar_subquery()
+    )
+    removed = 0
+
+    while True:
+        async for db in get_db():
+            result = await db.execute(delete(MessageLog).where(MessageLog.id.in_(batch)))
+            await db.commit()
+        removed += result.rowcount
+        if result.rowcount < settings.RETENTION_BATCH_SIZE:
+            break
+        await asyncio.sleep(settings.RETENTION_BATCH_PAUSE)
+
+    # Inbox previews are message text too
+    async for db in get_db():
+        cleared = await db.execute(
+            update(Conversation)
+            .where(Conversation.last_message_at < threshold_date, Conversation.last_message.isnot(None))
+            .values(last_message=None)
         )
-        await session.commit()
-    
-    print("🗑 Removed chat history older than 72 days")
-    
\ No newline at end of file
+        await db.commit()
+
+    await quota_backend.purge(datetime.now().date())
+    # Daily rollups outlive the raw rows; only the per-day user sets follow retention
+    await purge_active_users(threshold_date.date())
+
+    logger.info("🗑 Removed %d messages and %d previews older than %d days",
+                removed, cleared.rowcount, settings.MESSAGE_RETENTION_DAYS)
@@ -0,0 +1,21 @@
+"""
+token_health.py - Revalidate stored mini-bot tokens
+Owners who revoked their token in @BotFather are flagged and their bot is stopped.
+"""
+import logging
+from config import settings
+from services.bot_api import bot_api, revalidate_tokens
+from services.bot_fleet import fleet
+
+logger = logging.getLogger(__name__)
+
+
+async def check_bot_tokens(context=None):
+    revoked = await revalidate_tokens(
+        bot_api, concurrency=settings.TOKEN_CHECK_CONCURRENCY, page_size=settings.TOKEN_CHECK_PAGE_SIZE
+    )
+    for owner_id in revoked:
+        await fleet.remove_owner(owner_id)
+
+    if revoked:
+        logger.warning("🔑 Flagged %d revoked bot tokens: %s", len(revoked), revoked)
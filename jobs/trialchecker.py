@@ -1,43 +1,117 @@
 """
 trialchecker.py - Check owner trial expiry
+Handles:
+- Reminder 24 hours before a trial ends
+- Notice once a trial has ended
+- Ledger (trial_notifications) so each notice goes out exactly once
 """
-from database import SessionLocal, Owner
+import asyncio
+import logging
 from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, exists, tuple_
 from sqlalchemy.future import select
-from telegram import Bot
+from telegram.error import BadRequest, Forbidden, TelegramError
+from config import settings
+from database import get_db, upsert, Owner, TrialNotification
+from services.bot_fleet import fleet
+from services.outbox import outbox, NOTIFICATION
+from services.trial_index import trial_index
 
-async def check_trial(bot_token):
-    bot = Bot(token=bot_token)
-    
-    async with SessionLocal() as session:
-        result = await session.execute(select(Owner))
-        owners = result.scalars().all()
+logger = logging.getLogger(__name__)
 
+NOTICES = {
+    "reminder": "⏳ *Reminder*\nYour trial ends in *24 hours*.",
+    "expired": "⚠ *Your Free Trial Has Ended*\n\nYour bot is paused.\nUpgrade to activate again.",
+}
+
+
+async def due_owner_pages(kind: str, start: datetime, end: datetime, page_size: int):
+    """Keyset-paginate un-notified owners whose trial ends in [start, end)."""
+    notified = exists().where(and_(
+        TrialNotification.owner_id == Owner.id,
+        TrialNotification.kind == kind,
+        TrialNotification.trial_ends == Owner.trial_ends,
+    ))
+    base = (
+        select(Owner.id, Owner.telegram_id, Owner.trial_ends)
+        .where(Owner.trial_ends >= start, Owner.trial_ends < end)
+        .where(Owner.subscribed.isnot(True), ~notified)
+        .order_by(Owner.trial_ends, Owner.id)
+        .limit(page_size)
+    )
+    last = None
+    while True:
+        query = base if last is None else base.where(tuple_(Owner.trial_ends, Owner.id) > tuple_(*last))
+        async for db in get_db():
+            rows = (await db.execute(query)).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last = (rows[-1].trial_ends, rows[-1].id)
+
+
+async def _claim(owner_id: int, kind: str, trial_ends: datetime) -> bool:
+    stmt = (
+        upsert(TrialNotification)
+        .values(owner_id=owner_id, kind=kind, trial_ends=trial_ends)
+        .on_conflict_do_nothing()
+        .returning(TrialNotification.owner_id)
+    )
+    async for db in get_db():
+        claimed = (await db.execute(stmt)).first() is not None
+        await db.commit()
+    return claimed
+
+
+async def _release(owner_id: int, kind: str, trial_ends: datetime):
+    async for db in get_db():
+        await db.execute(delete(TrialNotification).where(
+            TrialNotification.owner_id == owner_id,
+            TrialNotification.kind == kind,
+            TrialNotification.trial_ends == trial_ends,
+        ))
+        await db.commit()
+
+
+async def _notify(bot, owner, kind: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        if not await _claim(owner.id, kind, owner.trial_ends):
+            return
+
+        try:
+            # The outbox applies the global rate limit and retries RetryAfter
+            await outbox.send(
+                bot.send_message,
+                int(owner.telegram_id),
+                priority=NOTIFICATION,
+                text=NOTICES[kind],
+                parse_mode="Markdown",
+            )
+        except (Forbidden, BadRequest) as e:
+            # Will never be deliverable (bot blocked, chat gone): keep the ledger entry
+            logger.info("Owner %s cannot receive %s notice: %s", owner.id, kind, e)
+        except TelegramError:
+            logger.exception("Sending %s notice to owner %s failed", kind, owner.id)
+            # Release the claim so the next run tries again
+            await _release(owner.id, kind, owner.trial_ends)
+
+
+async def check_trial(context):
     now = datetime.now()
+    windows = {
+        "reminder": (now, now + timedelta(days=1)),
+        "expired": (now - timedelta(days=settings.TRIAL_EXPIRED_LOOKBACK_DAYS), now),
+    }
+    semaphore = asyncio.Semaphore(settings.TRIAL_NOTIFY_CONCURRENCY)
+
+    for kind, (start, end) in windows.items():
+        async for page in due_owner_pages(kind, start, end, settings.TRIAL_NOTIFY_PAGE_SIZE):
+            await asyncio.gather(*(_notify(context.bot, owner, kind, semaphore) for owner in page))
+
 
-    for owner in owners:
-        if not owner.trial_ends:
-            continue
-            
-        expiry_date = owner.trial_ends
-
-        if now > expiry_date:
-            try:
-                await bot.send_message(
-                    chat_id=int(owner.telegram_id),
-                    text="⚠ *Your Free Trial Has Ended*\n\nYour bot is paused.\nUpgrade to activate again.",
-                    parse_mode="Markdown"
-                )
-            except:
-                pass
-                
-        elif (expiry_date - now).days == 1:
-            try:
-                await bot.send_message(
-                    chat_id=int(owner.telegram_id),
-                    text="⏳ *Reminder*\nYour trial ends in *24 hours*.",
-                    parse_mode="Markdown"
-                )
-            except:
-                pass
-                
\ No newline at end of file
+async def expire_trials(context):
+    """Stop the mini-bots of owners whose entitlement ran out since the last run."""
+    for owner_id, telegram_id in trial_index.pop_expired():
+        await fleet.remove_owner(owner_id)
@@ -1,49 +1,333 @@
 """
 ConnectsProBot — Main Application
 """
+import asyncio
+import importlib
+import logging
+import os
+import signal
+from datetime import time
+from telegram import Bot, Update
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 from config import settings
-from database import init_db
+import database
+from database import init_db, release_session, unit_of_work
 from handlers.menu import main_menu, about_page, settings_page
-from handlers.messaging import user_message_handler, reply_button_handler, send_owner_reply
-from handlers.security import anti_spam
-from handlers.export import export_json
-from handlers.lang import language_menu
+from handlers.messaging import user_message_handler, reply_button_handler, send_owner_reply, continue_album
+from handlers.security import check_message
+from handlers.lang import language_menu, set_language
+from handlers.admin import analytics_command, broadcast_command, stats_command
+from handlers.dashboard import dashboard, dashboard_page, open_thread
+from handlers.search import search_command, search_page
 from handlers.trialstop import trial_active
-from jobs.cleanup import delete_old_messages
-from jobs.trialchecker import check_trial
+from services.bot_api import bot_api
+from services.i18n import forget_locale
+from services.media import albums
+from services.message_buffer import message_buffer
+from services.metrics import metrics, instrument_engine, instrument_handler, instrument_job, InstrumentedRequest
+from services.outbox import PRIORITY_NAMES, outbox, reply
+from services.broadcast import resume_broadcasts, stop_broadcasts
+from services.owner_cache import owner_cache
+from services.trial_index import trial_index
+from services.persistence import DatabasePersistence
+from services.sharding import Coordinator, ShardWorker, peers, slot_of, worker_index
+from services.update_processor import PerChatUpdateProcessor
+
+logger = logging.getLogger(__name__)
+_warmup = None
+
+def deferred(path: str):
+    """Callback for ``module:function`` that imports the module on first use."""
+    module_name, name = path.split(":")
+    target = None
+
+    async def callback(*args):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), name)
+        return await target(*args)
+    callback.__name__ = callback.__qualname__ = name
+    return callback
+
+export_json = deferred("handlers.export:export_json")
+
+async def warm_caches():
+    started = asyncio.get_running_loop().time()
+    await trial_index.load()
+    warmed = await owner_cache.warm(settings.WARMUP_OWNERS)
+    logger.info("🔥 Warmed %d trial entries and %d owners in %.2fs",
+                len(trial_index), warmed, asyncio.get_running_loop().time() - started)
+
+def outbox_gauges(registry):
+    snapshot = outbox.metrics()
+    for event, value in snapshot["counters"].items():
+        registry.set("outbox_events", value, event=event)
+    for priority in PRIORITY_NAMES.values():
+        registry.set("outbox_queued", snapshot["queued"].get(priority, 0), priority=priority)
+    for priority, latency in snapshot["latency"].items():
+        registry.set("outbox_latency_avg_seconds", latency["avg"], priority=priority)
+        registry.set("outbox_latency_max_seconds", latency["max"], priority=priority)
 
 async def post_init(application):
+    shard = worker_index()
+    leader = shard in (None, 0)
     await init_db(settings.DATABASE_URL)
+    instrument_engine(database.engine)
+    await message_buffer.start()
+    if shard is not None:
+        # Workers share the bot's Telegram limits
+        outbox.global_rate = settings.TELEGRAM_GLOBAL_RATE / settings.SHARD_WORKERS
+    await outbox.start()
+    if leader:
+        await resume_broadcasts(application.bot)
+    if settings.WARMUP_CACHES:
+        # Answer updates right away; lookups fall back to the DB until this finishes
+        global _warmup
+        _warmup = asyncio.create_task(warm_caches())
+    else:
+        await trial_index.load()
+    if settings.WEBHOOK_URL:
+        from services.bot_fleet import fleet
+        await fleet.start(setup_mini_bot, listen=shard is None, register_webhooks=leader)
+    if settings.METRICS_PORT:
+        port = settings.METRICS_PORT if shard is None else settings.METRICS_PORT + 1 + shard
+        await metrics.start_server(settings.METRICS_HOST, port, extra=outbox_gauges)
+
+async def post_shutdown(application):
+    if _warmup is not None and not _warmup.done():
+        _warmup.cancel()
+    await metrics.stop_server()
+    await stop_broadcasts()
+    if settings.WEBHOOK_URL:
+        from services.bot_fleet import fleet
+        await fleet.stop()
+    await albums.stop()
+    await message_buffer.stop()
+    await outbox.stop()
+    await bot_api.close()
 
 async def message_router(update, context):
+    # Later parts of an album join the first one (reply_to is already cleared for owner replies).
+    # The first part of a user's album was checked and charged for the whole album.
+    if continue_album(update, context, "reply") or continue_album(update, context, "user"):
+        return
+    # Owner pressed "Reply" and is now typing the answer
+    if context.user_data.get("reply_to"):
+        await owner_reply_router(update, context)
+        return
     user_id = update.effective_user.id
-    if not anti_spam(user_id):
-        await update.message.reply_text("🚫 Slow down — Please wait 4 seconds.")
+    # Messages to the shared main bot are free mode; owner mini-bots are not limited by quota
+    refusal = await check_message(user_id, free_mode=not context.bot_data.get("owner_id"))
+    # The quota charge is the router's only write; don't hold the connection (or SQLite's write lock) while sending
+    await release_session()
+    if refusal:
+        await reply(update, refusal)
         return
     await user_message_handler(update, context)
 
 async def owner_reply_router(update, context):
+    if continue_album(update, context, "reply"):
+        return
     owner_id = update.effective_user.id
     if not await trial_active(owner_id):
-        await update.message.reply_text("⛔ Trial expired — upgrade required.")
+        await reply(update, "⛔ Trial expired — upgrade required.")
         return
     await send_owner_reply(update, context)
 
-def main():
-    application = ApplicationBuilder().token(settings.BOT_TOKEN).post_init(post_init).build()
-    
+def register_handlers(application):
     application.add_handler(CommandHandler("start", main_menu))
     application.add_handler(CommandHandler("export", export_json))
     application.add_handler(CommandHandler("language", language_menu))
+    application.add_handler(CommandHandler("dashboard", dashboard))
+    application.add_handler(CommandHandler("search", search_command))
     application.add_handler(CallbackQueryHandler(main_menu, pattern="back_menu"))
     application.add_handler(CallbackQueryHandler(about_page, pattern="about"))
     application.add_handler(CallbackQueryHandler(settings_page, pattern="settings"))
     application.add_handler(CallbackQueryHandler(reply_button_handler, pattern="reply_"))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.REPLY, message_router))
-    application.add_handler(MessageHandler(filters.REPLY & filters.TEXT, owner_reply_router))
-    
-    application.run_polling()
+    application.add_handler(CallbackQueryHandler(set_language, pattern="lang_"))
+    application.add_handler(CallbackQueryHandler(dashboard_page, pattern="dash_"))
+    application.add_handler(CallbackQueryHandler(open_thread, pattern="thread_"))
+    application.add_handler(CallbackQueryHandler(search_page, pattern="srch_"))
+    content = filters.TEXT | filters.ATTACHMENT
+    application.add_handler(MessageHandler(content & ~filters.COMMAND & ~filters.REPLY, message_router))
+    application.add_handler(MessageHandler(filters.REPLY & content, owner_reply_router))
+
+def wrap_handlers(application):
+    """Give every handler one lazily opened DB session per update (unit of work) and metrics."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = instrument_handler(unit_of_work(handler.callback))
+
+def setup_mini_bot(application):
+    register_handlers(application)
+    wrap_handlers(application)
+
+def stop_event():
+    """Event set on SIGINT / SIGTERM."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    return stop
+
+async def serve(application, body):
+    """Run ``application`` without an updater until a stop signal or until ``body()`` returns."""
+    stop = stop_event()
+    await application.initialize()
+    try:
+        await post_init(application)
+        await application.start()
+        tasks = {asyncio.create_task(body()), asyncio.create_task(stop.wait())}
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        await post_shutdown(application)
+
+async def run_webhook(application):
+    """Serve the main bot from the fleet's aiohttp listener instead of polling."""
+    from services.bot_fleet import fleet
+
+    async def body():
+        await fleet.attach(application)
+        await asyncio.Event().wait()
+
+    await serve(application, body)
+
+async def run_coordinator():
+    """Sharded mode ingress: receive every update and route it to a worker by chat."""
+    if settings.WEBHOOK_URL and not settings.WEBHOOK_SECRET:
+        raise SystemExit("WEBHOOK_SECRET is required when SHARD_WORKERS > 1 and WEBHOOK_URL is set")
+    stop = stop_event()
+    await init_db(settings.DATABASE_URL)
+
+    async def load_tokens():
+        return [settings.BOT_TOKEN, *(token for _, token in await database.get_active_bot_tokens())]
+
+    coordinator = Coordinator(settings.SHARD_WORKERS, settings.SHARD_SLOTS, settings.SHARD_SOCKET,
+                              [os.path.abspath(__file__)], load_tokens=load_tokens)
+    await coordinator.start()
+    runner = poller = None
+    try:
+        async with Bot(settings.BOT_TOKEN, request=InstrumentedRequest()) as bot:
+            if settings.WEBHOOK_URL:
+                runner = await coordinator.serve_webhooks(settings.WEBHOOK_HOST, settings.WEBHOOK_PORT,
+                                                          settings.WEBHOOK_SECRET)
+            if settings.WEBHOOK_URL and settings.MAIN_BOT_WEBHOOK:
+                await bot.set_webhook(
+                    url=f"{settings.WEBHOOK_URL.rstrip('/')}/bot/{bot.token}",
+                    secret_token=settings.WEBHOOK_SECRET or None,
+                )
+            else:
+                await bot.delete_webhook()
+                poller = asyncio.create_task(coordinator.poll(bot, stop))
+            logger.info("🧩 Routing updates to %d workers", settings.SHARD_WORKERS)
+            await stop.wait()
+            if poller is not None:
+                poller.cancel()
+                await asyncio.gather(poller, return_exceptions=True)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await coordinator.stop()
+        await database.engine.dispose()
+
+async def run_worker(application, index: int):
+    """Sharded mode worker: process the updates the coordinator routes to this process."""
+    from services.bot_fleet import fleet
+
+    def applications():
+        return [application, *fleet.applications()]
+
+    async def dispatch(token, data):
+        if token == application.bot.token:
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        elif not (fleet.running and await fleet.dispatch(token, data)):
+            logger.warning("Dropping update for an unknown bot")
+
+    async def drain():
+        # Finish everything already queued for the slots leaving, then persist their state
+        for app in applications():
+            await app.update_queue.join()
+        while albums.pending:
+            await asyncio.sleep(0.05)
+        for app in applications():
+            await app.update_persistence()
+            await app.persistence.flush()
+
+    def assign(slots):
+        # Chats served elsewhere meanwhile must be re-read from the database
+        for app in applications():
+            users = [k for k in app.user_data if slot_of(k, settings.SHARD_SLOTS) in slots]
+            chats = [k for k in app.chat_data if slot_of(k, settings.SHARD_SLOTS) in slots]
+            app.persistence.forget("user", users)
+            app.persistence.forget("chat", chats)
+            for user_id in users:
+                forget_locale(app.bot.id, user_id)
+
+    async def owner_changed(owner_id, telegram_id):
+        owner_cache.invalidate(telegram_id, owner_id)
+        owner = await owner_cache.by_id(owner_id)
+        if owner:
+            trial_index.update(owner)
+
+    async def remove_owner(owner_id):
+        if fleet.running:
+            await fleet.remove_owner(owner_id, propagate=False)
+
+    peers.subscribe("owner_changed", owner_changed)
+    peers.subscribe("remove_owner", remove_owner)
+    worker = ShardWorker(index, os.environ["SHARD_SOCKET"], settings.SHARD_SLOTS, dispatch, drain, assign)
+    await serve(application, worker.run)
+
+def main():
+    shard = worker_index()
+    if shard is None and settings.SHARD_WORKERS > 1:
+        asyncio.run(run_coordinator())
+        return
+
+    builder = (
+        ApplicationBuilder()
+        .token(settings.BOT_TOKEN)
+        .request(InstrumentedRequest(connection_pool_size=256))
+        .concurrent_updates(PerChatUpdateProcessor(settings.CONCURRENT_UPDATES))
+        .persistence(DatabasePersistence("main", settings.PERSISTENCE_INTERVAL))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    webhook = settings.MAIN_BOT_WEBHOOK and settings.WEBHOOK_URL
+    if webhook or shard is not None:
+        builder = builder.updater(None)
+    if shard:
+        # Scheduled jobs run on worker 0 only
+        builder = builder.job_queue(None)
+    application = builder.build()
+    register_handlers(application)
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("analytics", analytics_command))
+    wrap_handlers(application)
+    jobs = application.job_queue
+    if jobs is not None:
+        jobs.run_repeating(instrument_job(deferred("jobs.trialchecker:expire_trials")), interval=60, first=60)
+        jobs.run_repeating(instrument_job(deferred("jobs.trialchecker:check_trial")),
+                           interval=settings.TRIAL_CHECK_INTERVAL, first=30)
+        jobs.run_repeating(instrument_job(deferred("jobs.token_health:check_bot_tokens")),
+                           interval=settings.TOKEN_CHECK_INTERVAL, first=300)
+        jobs.run_daily(instrument_job(deferred("jobs.cleanup:delete_old_messages")),
+                       time=time(hour=settings.RETENTION_RUN_HOUR))
+
+    if shard is not None:
+        asyncio.run(run_worker(application, shard))
+    elif webhook:
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+"""
+migrations.py - Versioned schema changes
+
+The applied version lives in schema_version, so a boot against a current
+schema costs a single query. Pending migrations run in order inside one
+transaction (serialised with an advisory lock on PostgreSQL). Steps are
+idempotent: a fresh database gets every table from the models in migration 1
+and later steps skip what already exists.
+"""
+import logging
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from database import Base, DailyActiveUser, MessageLog, Owner, OwnerDailyStats
+
+logger = logging.getLogger(__name__)
+
+_LOCK_ID = 0x436F6E6E   # pg advisory lock key for migrations
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("applied_at", DateTime, default=func.now()),
+)
+
+
+def add_column(conn, table: str, name: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there."""
+    if name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def create_indexes(conn, *tables):
+    for table in tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _initial(conn):
+    Base.metadata.create_all(conn)
+
+
+def _token_revoked_and_indexes(conn):
+    add_column(conn, "owners", "token_revoked", "BOOLEAN DEFAULT FALSE")
+    create_indexes(conn, Owner.__table__, MessageLog.__table__)
+
+
+def _message_search(conn):
+    if conn.dialect.name == "postgresql":
+        # Expression index; services/search.py queries the identical expression
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_message_logs_search "
+            "ON message_logs USING GIN (to_tsvector('simple', message))"
+        ))
+        return
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS message_search "
+        "USING fts5(message, content='message_logs', content_rowid='id')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS message_search_ai AFTER INSERT ON message_logs BEGIN "
+        "INSERT INTO message_search(rowid, message) VALUES (new.id, new.message); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS message_search_ad AFTER DELETE ON message_logs BEGIN "
+        "INSERT INTO message_search(message_search, rowid, message) VALUES ('delete', old.id, old.message); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS message_search_au AFTER UPDATE OF message ON message_logs BEGIN "
+        "INSERT INTO message_search(message_search, rowid, message) VALUES ('delete', old.id, old.message); "
+        "INSERT INTO message_search(rowid, message) VALUES (new.id, new.message); END"
+    ))
+    conn.execute(text("INSERT INTO message_search(message_search) VALUES ('rebuild')"))
+
+
+def _analytics(conn):
+    add_column(conn, "conversations", "awaiting_since", "TIMESTAMP")
+    for model in (OwnerDailyStats, DailyActiveUser):
+        model.__table__.create(conn, checkfirst=True)
+
+
+def _media_ref(conn):
+    add_column(conn, "message_logs", "media_ref", "VARCHAR")
+
+
+def _main_bot(conn):
+    add_column(conn, "message_logs", "main_bot", "BOOLEAN")
+    # Older rows: only owners without a mini-bot can have received them through the main bot
+    conn.execute(text(
+        "UPDATE message_logs SET main_bot = (owner_id IS NULL OR owner_id IN "
+        "(SELECT id FROM owners WHERE bot_token IS NULL))"
+    ))
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial),
+    (2, "owners.token_revoked, owner and message log indexes", _token_revoked_and_indexes),
+    (3, "full-text search over message_logs.message", _message_search),
+    (4, "analytics rollups, conversations.awaiting_since", _analytics),
+    (5, "message_logs.media_ref", _media_ref),
+    (6, "message_logs.main_bot", _main_bot),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    try:
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        # No schema_version table yet
+        conn.rollback()
+        return 0
+
+
+def _apply(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_ID})
+    schema_version.create(conn, checkfirst=True)
+    # Another worker may have migrated while we waited for the lock
+    version = current_version(conn)
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("🛠 Applying migration %d: %s", number, description)
+        step(conn)
+        conn.execute(schema_version.insert().values(version=number))
+    return max(version, LATEST)
+
+
+async def migrate(engine) -> int:
+    """Bring the schema up to LATEST; returns the resulting version."""
+    async with engine.connect() as conn:
+        version = await conn.run_sync(current_version)
+    if version >= LATEST:
+        return version
+    async with engine.begin() as conn:
+        return await conn.run_sync(_apply)
@@ -0,0 +1,143 @@
+"""
+read_models.py - Column projections for hot reads
+Handles:
+- Owner lookups for routing and entitlement checks, without bio, logo or bot token
+- Message and conversation rows for exports, threads and the inbox
+- Plain named tuples instead of session-tracked ORM objects
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.future import select
+
+import database
+from database import Conversation, MessageLog, Owner, session_scope
+
+
+class OwnerRef(NamedTuple):
+    id: int
+    telegram_id: str
+    business_name: str
+    subscription_plan: str
+    trial_ends: Optional[datetime]
+    subscribed: bool
+
+
+class MessageRow(NamedTuple):
+    id: int
+    user_id: str
+    message: Optional[str]
+    media_ref: Optional[str]
+    timestamp: datetime
+
+
+class ConversationRow(NamedTuple):
+    user_id: str
+    last_message: Optional[str]
+    last_message_at: datetime
+    unread_count: int
+
+
+def _columns(model, row_type):
+    return [getattr(model, name) for name in row_type._fields]
+
+
+OWNER_COLUMNS = _columns(Owner, OwnerRef)
+MESSAGE_COLUMNS = _columns(MessageLog, MessageRow)
+CONVERSATION_COLUMNS = _columns(Conversation, ConversationRow)
+
+
+async def _first(query, row_type):
+    async with session_scope() as db:
+        row = (await db.execute(query.limit(1))).first()
+    return row_type._make(row) if row is not None else None
+
+
+async def _all(query, row_type):
+    async with session_scope() as db:
+        result = await db.execute(query)
+        return [row_type._make(row) for row in result]
+
+
+# --- Owners ---
+
+async def owner_by_id(owner_id: int):
+    return await _first(select(*OWNER_COLUMNS).where(Owner.id == owner_id), OwnerRef)
+
+
+async def owner_by_telegram_id(telegram_id: str):
+    return await _first(select(*OWNER_COLUMNS).where(Owner.telegram_id == telegram_id), OwnerRef)
+
+
+async def default_owner():
+    """Owner that receives messages sent to the main bot without a deep link."""
+    return await _first(select(*OWNER_COLUMNS).order_by(Owner.id), OwnerRef)
+
+
+async def recently_active_owners(limit: int):
+    """Owners with the latest conversations, for cache warmup."""
+    recent = (
+        select(Conversation.owner_id)
+        .group_by(Conversation.owner_id)
+        .order_by(func.max(Conversation.last_message_at).desc())
+        .limit(limit)
+    ).subquery()
+    return await _all(select(*OWNER_COLUMNS).join(recent, Owner.id == recent.c.owner_id), OwnerRef)
+
+
+# --- Messages ---
+
+async def messages_for_owner(owner_id: int, limit: int = 100):
+    """Newest messages first, served by the (owner_id, timestamp) index."""
+    return await _all(
+        select(*MESSAGE_COLUMNS)
+        .where(MessageLog.owner_id == owner_id)
+        .order_by(MessageLog.timestamp.desc())
+        .limit(limit),
+        MessageRow,
+    )
+
+
+async def stream_messages(owner_id: int, since=None, until=None, user_id=None, batch_size: int = 1000):
+    query = select(*MESSAGE_COLUMNS).where(MessageLog.owner_id == owner_id)
+    if since:
+        query = query.where(MessageLog.timestamp >= since)
+    if until:
+        query = query.where(MessageLog.timestamp < until)
+    if user_id:
+        query = query.where(MessageLog.user_id == user_id)
+    query = query.order_by(MessageLog.id).execution_options(yield_per=batch_size)
+
+    async with database.SessionLocal() as session:
+        result = await session.stream(query)
+        async for row in result:
+            yield MessageRow._make(row)
+
+
+async def thread_page(owner_id: int, user_id: str, before=None, limit: int = 20):
+    """Newest messages of one thread first. ``before`` is the (timestamp, id) of the previous page's last row."""
+    query = (
+        select(*MESSAGE_COLUMNS)
+        .where(MessageLog.owner_id == owner_id, MessageLog.user_id == user_id)
+        .order_by(MessageLog.timestamp.desc(), MessageLog.id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        query = query.where(tuple_(MessageLog.timestamp, MessageLog.id) < tuple_(*before))
+    return await _all(query, MessageRow)
+
+
+# --- Conversations ---
+
+async def latest_conversations(owner_id: int, before=None, limit: int = 10):
+    """Newest conversations first. ``before`` is the (last_message_at, user_id) of the previous page's last row."""
+    query = (
+        select(*CONVERSATION_COLUMNS)
+        .where(Conversation.owner_id == owner_id)
+        .order_by(Conversation.last_message_at.desc(), Conversation.user_id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        query = query.where(tuple_(Conversation.last_message_at, Conversation.user_id) < tuple_(*before))
+    return await _all(query, ConversationRow)
@@ -0,0 +1,142 @@
+"""
+analytics.py
+Handles:
+- Per owner / per day rollups kept at ingest time (messages in and out, unique users, reply latency)
+- Exact daily active-user sets, purged together with the raw messages
+- Summaries for the admin /analytics command that never touch message_logs
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, tuple_, update
+from sqlalchemy.future import select
+
+from config import settings
+from database import session_scope, upsert, Conversation, DailyActiveUser, Owner, OwnerDailyStats
+
+
+async def record_inbound(db, rows):
+    """Fold a batch of new MessageLog rows into the daily rollups (same transaction)."""
+    counts = defaultdict(int)
+    users = set()
+    for row in rows:
+        if row.get("owner_id") is None:
+            continue
+        day = row["timestamp"].date()
+        counts[(row["owner_id"], day)] += 1
+        users.add((row["owner_id"], day, row["user_id"]))
+
+    if not counts:
+        return
+
+    stmt = upsert(OwnerDailyStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OwnerDailyStats.owner_id, OwnerDailyStats.day],
+        set_={"messages_in": OwnerDailyStats.messages_in + stmt.excluded.messages_in},
+    )
+    await db.execute(stmt, [
+        {"owner_id": owner_id, "day": day, "messages_in": n} for (owner_id, day), n in counts.items()
+    ])
+
+    await db.execute(
+        upsert(DailyActiveUser).on_conflict_do_nothing(),
+        [{"owner_id": owner_id, "day": day, "user_id": user_id} for owner_id, day, user_id in users],
+    )
+
+    # Recount only the touched owner/days; the set is tiny next to the log
+    active = (
+        select(func.count())
+        .where(DailyActiveUser.owner_id == OwnerDailyStats.owner_id, DailyActiveUser.day == OwnerDailyStats.day)
+        .scalar_subquery()
+    )
+    touched = tuple_(OwnerDailyStats.owner_id, OwnerDailyStats.day).in_(list(counts))
+    await db.execute(update(OwnerDailyStats).where(touched).values(unique_users=active))
+
+
+async def record_reply(owner_id: int, user_id: str, at: datetime = None):
+    """Count an owner reply and, if the user was waiting, the time it took."""
+    at = at or datetime.now()
+    async with session_scope() as db:
+        conversation = await db.get(Conversation, (owner_id, str(user_id)))
+        waited = None
+        if conversation is not None and conversation.awaiting_since is not None:
+            waited = max(0.0, (at - conversation.awaiting_since).total_seconds())
+            conversation.awaiting_since = None
+
+        stmt = upsert(OwnerDailyStats).values(
+            owner_id=owner_id, day=at.date(), messages_out=1,
+            replies_timed=1 if waited is not None else 0,
+            reply_seconds_total=waited or 0, reply_seconds_max=waited or 0,
+        )
+        greatest = func.max if db.bind.dialect.name == "sqlite" else func.greatest
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OwnerDailyStats.owner_id, OwnerDailyStats.day],
+            set_={
+                "messages_out": OwnerDailyStats.messages_out + 1,
+                "replies_timed": OwnerDailyStats.replies_timed + stmt.excluded.replies_timed,
+                "reply_seconds_total": OwnerDailyStats.reply_seconds_total + stmt.excluded.reply_seconds_total,
+                "reply_seconds_max": greatest(OwnerDailyStats.reply_seconds_max, stmt.excluded.reply_seconds_max),
+            },
+        )
+        await db.execute(stmt)
+
+
+async def summary(days: int = 7, top: int = 5):
+    """Totals for the last ``days`` days (today included) plus the busiest owners."""
+    today = datetime.now().date()
+    since = today - timedelta(days=days - 1)
+    in_range = OwnerDailyStats.day >= since
+    async with session_scope() as db:
+        totals = (await db.execute(
+            select(
+                func.coalesce(func.sum(OwnerDailyStats.messages_in), 0),
+                func.coalesce(func.sum(OwnerDailyStats.messages_out), 0),
+                func.coalesce(func.sum(OwnerDailyStats.replies_timed), 0),
+                func.coalesce(func.sum(OwnerDailyStats.reply_seconds_total), 0),
+                func.count(func.distinct(OwnerDailyStats.owner_id)),
+            ).where(in_range)
+        )).one()
+
+        # Exact distinct users only while the daily sets still cover the whole range
+        unique_users = None
+        if since >= today - timedelta(days=settings.MESSAGE_RETENTION_DAYS):
+            pairs = (
+                select(DailyActiveUser.owner_id, DailyActiveUser.user_id)
+                .where(DailyActiveUser.day >= since)
+                .distinct()
+            )
+            unique_users = (await db.execute(select(func.count()).select_from(pairs.subquery()))).scalar()
+
+        daily = (await db.execute(
+            select(OwnerDailyStats.day, func.sum(OwnerDailyStats.messages_in), func.sum(OwnerDailyStats.unique_users))
+            .where(in_range).group_by(OwnerDailyStats.day).order_by(OwnerDailyStats.day)
+        )).all()
+
+        busiest = (await db.execute(
+            select(Owner.business_name, func.sum(OwnerDailyStats.messages_in).label("messages"))
+            .join(Owner, Owner.id == OwnerDailyStats.owner_id)
+            .where(in_range)
+            .group_by(Owner.id, Owner.business_name)
+            .order_by(func.sum(OwnerDailyStats.messages_in).desc())
+            .limit(top)
+        )).all()
+
+    messages_in, messages_out, replies_timed, reply_seconds, active_owners = totals
+    return {
+        "days": days,
+        "messages_in": messages_in,
+        "messages_out": messages_out,
+        "active_owners": active_owners,
+        "unique_users": unique_users,
+        "avg_reply_seconds": reply_seconds / replies_timed if replies_timed else None,
+        "daily": [(day, n, users) for day, n, users in daily],
+        "busiest": [(name, n) for name, n in busiest],
+    }
+
+
+async def purge_active_users(before_day):
+    """Drop active-user sets older than ``before_day``; the daily rollups stay."""
+    async with session_scope() as db:
+        result = await db.execute(delete(DailyActiveUser).where(DailyActiveUser.day < before_day))
+    return result.rowcount
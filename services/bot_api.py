@@ -0,0 +1,129 @@
+"""
+bot_api.py
+Handles:
+- One pooled aiohttp session for raw Bot API calls (keep-alive, timeouts, retries)
+- TTL cache of getMe results per token
+- Bounded-concurrency revalidation of every stored Owner.bot_token
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from config import settings
+from database import get_db, Owner
+from services.metrics import observe_telegram_call
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.telegram.org/bot{token}/{method}"
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class BotApiClient:
+    def __init__(self, pool_size: int, timeout: float, retries: int, cache_ttl: float):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.cache_ttl = cache_ttl
+        self._session = None
+        self._me_cache = {}   # token -> (expires_at, result or None)
+
+    def _get_session(self):
+        import aiohttp   # deferred: most boots never call the raw API before the first job
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def call(self, token: str, method: str, **params):
+        """Return (http status, decoded JSON body), retrying connection errors and 5xx."""
+        import aiohttp
+
+        url = API_URL.format(token=token, method=method)
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                async with self._get_session().post(url, json=params or None) as response:
+                    observe_telegram_call(method, time.perf_counter() - started, response.status)
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+                        continue
+                    return response.status, await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                observe_telegram_call(method, time.perf_counter() - started, "error")
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def get_me(self, token: str, use_cache: bool = True):
+        """getMe result for ``token``, or None if Telegram rejects the token."""
+        cached = self._me_cache.get(token)
+        if use_cache and cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        status, body = await self.call(token, "getMe")
+        if status == 200 and body.get("ok"):
+            me = body["result"]
+        elif status in (401, 404):
+            me = None
+        else:
+            raise RuntimeError(f"getMe failed with HTTP {status}")
+
+        self._me_cache[token] = (time.monotonic() + self.cache_ttl, me)
+        if len(self._me_cache) > 10000:
+            now = time.monotonic()
+            self._me_cache = {t: e for t, e in self._me_cache.items() if e[0] > now}
+        return me
+
+
+async def revalidate_tokens(client: BotApiClient, concurrency: int, page_size: int):
+    """Re-check every stored bot token; returns ids of owners whose token was revoked."""
+    semaphore = asyncio.Semaphore(concurrency)
+    revoked = []
+
+    async def check(owner_id, token):
+        async with semaphore:
+            try:
+                if await client.get_me(token, use_cache=False) is None:
+                    revoked.append(owner_id)
+            except Exception:
+                logger.warning("Could not revalidate token of owner %s", owner_id, exc_info=True)
+
+    last_id = 0
+    while True:
+        async for db in get_db():
+            rows = (await db.execute(
+                select(Owner.id, Owner.bot_token)
+                .where(Owner.bot_token.isnot(None), Owner.token_revoked.isnot(True), Owner.id > last_id)
+                .order_by(Owner.id)
+                .limit(page_size)
+            )).all()
+        if not rows:
+            break
+        await asyncio.gather(*(check(owner_id, token) for owner_id, token in rows))
+        last_id = rows[-1].id
+
+    if revoked:
+        async for db in get_db():
+            await db.execute(update(Owner).where(Owner.id.in_(revoked)).values(token_revoked=True))
+            await db.commit()
+    return revoked
+
+
+bot_api = BotApiClient(
+    pool_size=settings.BOT_API_POOL_SIZE,
+    timeout=settings.BOT_API_TIMEOUT,
+    retries=settings.BOT_API_RETRIES,
+    cache_ttl=settings.BOT_API_CACHE_TTL,
+)
@@ -0,0 +1,205 @@
+"""
+bot_fleet.py
+Handles:
+- Hosting every owner mini-bot in one process
+- One aiohttp webhook listener routed by token path
+- Shared HTTP connection pool across all mini-bots
+- Hot add / remove when owners onboard or trials end
+- Sharded workers: no listener, bots loaded on first forwarded update
+"""
+
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+
+from config import settings
+from database import get_active_bot_tokens
+from services.metrics import InstrumentedRequest
+from services.persistence import DatabasePersistence
+from services.sharding import peers
+from services.update_processor import PerChatUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class SharedRequest(InstrumentedRequest):
+    """Instrumented request whose connection pool outlives the bots using it."""
+
+    async def shutdown(self):
+        # Bots call shutdown() when removed; the pool belongs to the fleet.
+        pass
+
+    async def close(self):
+        await super().shutdown()
+
+
+class BotFleet:
+    def __init__(self):
+        self._apps = {}      # bot token -> Application
+        self._external = set()   # tokens of applications whose lifecycle is managed elsewhere
+        self._tokens = {}    # owner id -> bot token
+        self._setup = None
+        self._request = None
+        self._runner = None
+        self._started = False
+        self._unknown = {}       # token -> monotonic time until which it is known not to be active
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self):
+        return self._started
+
+    def __len__(self):
+        return len(self._apps) - len(self._external)
+
+    def applications(self):
+        return [app for token, app in self._apps.items() if token not in self._external]
+
+    async def dispatch(self, token: str, data):
+        """Queue an update forwarded by the sharding coordinator. False if the bot is unknown."""
+        application = await self.application_for(token)
+        if application is None:
+            return False
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        return True
+
+    async def start(self, setup, listen: bool = True, register_webhooks: bool = True):
+        """Start the webhook listener and load every active owner bot.
+
+        ``setup`` is called with each new Application to register handlers.
+        Sharded workers pass ``listen=False``: the coordinator receives the
+        webhooks and forwards updates through ``application_for``; only one of
+        them registers webhooks, the others start bots on first use.
+        """
+        self._setup = setup
+        self._request = SharedRequest(connection_pool_size=settings.FLEET_POOL_SIZE)
+        await self._request.initialize()
+        self._started = True
+
+        if listen:
+            app = web.Application()
+            app.router.add_post("/bot/{token}", self._handle_update)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT).start()
+
+        for owner_id, token in await get_active_bot_tokens() if register_webhooks else ():
+            try:
+                await self.add_bot(owner_id, token)
+            except Exception:
+                logger.exception("Could not start mini-bot for owner %s", owner_id)
+
+        logger.info("Bot fleet started with %d mini-bots", len(self))
+
+    async def stop(self):
+        if not self.running:
+            return
+        for token in list(self._apps):
+            if token in self._external:
+                self._apps.pop(token)
+            else:
+                await self._remove(token, delete_webhook=False)
+        self._external.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await self._request.close()
+        self._started = False
+
+    async def attach(self, application):
+        """Serve an already running Application (the main bot) from the shared listener."""
+        token = application.bot.token
+        await application.bot.set_webhook(
+            url=f"{settings.WEBHOOK_URL.rstrip('/')}/bot/{token}",
+            secret_token=settings.WEBHOOK_SECRET or None,
+        )
+        self._apps[token] = application
+        self._external.add(token)
+
+    async def add_bot(self, owner_id: int, token: str, set_webhook: bool = True):
+        async with self._lock:
+            if token in self._apps:
+                return
+            if owner_id in self._tokens:
+                await self._remove(self._tokens[owner_id])
+
+            application = (
+                ApplicationBuilder()
+                .token(token)
+                .request(self._request)
+                .get_updates_request(self._request)
+                .updater(None)
+                .job_queue(None)
+                .concurrent_updates(PerChatUpdateProcessor(settings.CONCURRENT_UPDATES))
+                .persistence(DatabasePersistence(f"mini{owner_id}", settings.PERSISTENCE_INTERVAL))
+                .build()
+            )
+            application.bot_data["owner_id"] = owner_id
+            self._setup(application)
+
+            await application.initialize()
+            await application.start()
+            if set_webhook:
+                await application.bot.set_webhook(
+                    url=f"{settings.WEBHOOK_URL.rstrip('/')}/bot/{token}",
+                    secret_token=settings.WEBHOOK_SECRET or None,
+                )
+            self._apps[token] = application
+            self._tokens[owner_id] = token
+
+    async def remove_owner(self, owner_id: int, propagate: bool = True):
+        async with self._lock:
+            token = self._tokens.get(owner_id)
+            if token:
+                await self._remove(token, delete_webhook=propagate)
+        if propagate:
+            # Other sharded workers host the same bot
+            await peers.publish("remove_owner", owner_id=owner_id)
+
+    async def application_for(self, token: str):
+        """Application serving ``token``, started on demand (sharded workers)."""
+        application = self._apps.get(token)
+        if application is not None or self._unknown.get(token, 0) > time.monotonic():
+            return application
+        for owner_id, active_token in await get_active_bot_tokens():
+            if active_token == token:
+                await self.add_bot(owner_id, token, set_webhook=False)
+                return self._apps.get(token)
+        self._unknown[token] = time.monotonic() + 60
+        if len(self._unknown) > 10000:
+            now = time.monotonic()
+            self._unknown = {t: e for t, e in self._unknown.items() if e > now}
+        return None
+
+    async def _remove(self, token: str, delete_webhook: bool = True):
+        application = self._apps.pop(token, None)
+        if application is None:
+            return
+        self._tokens.pop(application.bot_data.get("owner_id"), None)
+        try:
+            if delete_webhook:
+                await application.bot.delete_webhook()
+        except Exception:
+            logger.exception("Could not delete webhook for removed mini-bot")
+        await application.stop()
+        await application.shutdown()
+
+    async def _handle_update(self, request):
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if settings.WEBHOOK_SECRET and secret != settings.WEBHOOK_SECRET:
+            return web.Response(status=403)
+
+        application = self._apps.get(request.match_info["token"])
+        if application is None:
+            return web.Response(status=404)
+
+        update = Update.de_json(await request.json(), application.bot)
+        await application.update_queue.put(update)
+        return web.Response()
+
+
+fleet = BotFleet()
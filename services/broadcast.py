@@ -0,0 +1,184 @@
+"""
+broadcast.py
+Handles:
+- Global announcements to owners or users
+- Keyset-paginated recipient streaming (distinct, never loaded at once)
+- Bounded-concurrency sends through the outbox
+- Checkpointing to the broadcasts table, resumed on startup
+- Live throughput / ETA reports to the admin
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import distinct, func, update
+from sqlalchemy.future import select
+
+from config import settings
+from database import get_db, Broadcast, MessageLog, Owner
+from services.outbox import outbox, BROADCAST
+
+logger = logging.getLogger(__name__)
+
+AUDIENCES = {
+    "owners": Owner.telegram_id,
+    "users": MessageLog.user_id,
+}
+# Broadcasts go out through the main bot; users who only wrote to a mini-bot cannot be reached
+AUDIENCE_FILTERS = {
+    "users": MessageLog.main_bot.is_(True),
+}
+
+_running = {}   # broadcast id -> asyncio.Task
+
+
+async def count_recipients(audience: str) -> int:
+    column = AUDIENCES[audience]
+    query = select(func.count(distinct(column))).where(*_conditions(audience))
+    async for db in get_db():
+        return (await db.execute(query)).scalar_one()
+
+
+def _conditions(audience: str):
+    conditions = [AUDIENCES[audience].isnot(None)]
+    if audience in AUDIENCE_FILTERS:
+        conditions.append(AUDIENCE_FILTERS[audience])
+    return conditions
+
+
+async def recipient_pages(audience: str, after: str = None, page_size: int = 500):
+    """Yield pages of distinct chat ids, ordered so ``after`` can resume the stream."""
+    column = AUDIENCES[audience]
+    base = select(column).where(*_conditions(audience)).distinct().order_by(column).limit(page_size)
+    while True:
+        query = base if after is None else base.where(column > after)
+        async for db in get_db():
+            page = (await db.execute(query)).scalars().all()
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after = page[-1]
+
+
+async def start_broadcast(bot, audience: str, text: str, admin_chat_id) -> int:
+    total = await count_recipients(audience)
+    async for db in get_db():
+        broadcast = Broadcast(audience=audience, text=text, admin_chat_id=str(admin_chat_id), total=total)
+        db.add(broadcast)
+        await db.commit()
+
+    _launch(bot, broadcast)
+    return broadcast.id
+
+
+async def resume_broadcasts(bot):
+    async for db in get_db():
+        result = await db.execute(select(Broadcast).where(Broadcast.status == "running"))
+        pending = result.scalars().all()
+    for broadcast in pending:
+        logger.info("Resuming broadcast #%s after %s", broadcast.id, broadcast.last_key)
+        _launch(bot, broadcast)
+
+
+async def stop_broadcasts():
+    """Cancel running broadcasts; their checkpoint lets the next start resume them."""
+    tasks = list(_running.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _launch(bot, broadcast):
+    if broadcast.id not in _running:
+        task = asyncio.create_task(_run_or_fail(bot, broadcast))
+        _running[broadcast.id] = task
+        task.add_done_callback(lambda _: _running.pop(broadcast.id, None))
+
+
+async def _run_or_fail(bot, broadcast):
+    try:
+        await run_broadcast(bot, broadcast)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Broadcast #%s failed", broadcast.id)
+        try:
+            await _checkpoint(broadcast, status="failed")
+        except Exception:
+            logger.exception("Could not mark broadcast #%s as failed", broadcast.id)
+
+
+async def _checkpoint(broadcast, **values):
+    async for db in get_db():
+        await db.execute(update(Broadcast).where(Broadcast.id == broadcast.id).values(**values))
+        await db.commit()
+
+
+async def _deliver(bot, chat_id: str, text: str, semaphore: asyncio.Semaphore) -> bool:
+    async with semaphore:
+        try:
+            await outbox.send(bot.send_message, int(chat_id), priority=BROADCAST, text=text)
+            return True
+        except Exception as e:
+            logger.info("Broadcast to %s failed: %s", chat_id, e)
+            return False
+
+
+def _progress_text(broadcast, sent: int, failed: int, rate: float, done: bool = False) -> str:
+    processed = sent + failed
+    if done:
+        head = f"✅ *Broadcast #{broadcast.id} finished*"
+    else:
+        head = f"📣 *Broadcast #{broadcast.id} running*"
+    remaining = max(broadcast.total - processed, 0)
+    eta = int(remaining / rate) if rate > 0 else 0
+    return (
+        f"{head}\n\n"
+        f"Audience: {broadcast.audience}\n"
+        f"Sent: {sent} / {broadcast.total}  (failed: {failed})\n"
+        f"Speed: {rate:.1f} msg/s\n"
+        + ("" if done else f"ETA: {eta // 60}m {eta % 60}s")
+    )
+
+
+async def _edit_report(bot, report, text: str):
+    await outbox.send(
+        bot.edit_message_text, report.chat_id, priority=BROADCAST,
+        message_id=report.message_id, text=text, parse_mode="Markdown",
+    )
+
+
+async def run_broadcast(bot, broadcast):
+    semaphore = asyncio.Semaphore(settings.BROADCAST_CONCURRENCY)
+    sent, failed = broadcast.sent or 0, broadcast.failed or 0
+    started, processed_here = time.monotonic(), 0
+    last_report = 0.0
+
+    report = await outbox.send(
+        bot.send_message, int(broadcast.admin_chat_id), priority=BROADCAST,
+        text=_progress_text(broadcast, sent, failed, 0.0), parse_mode="Markdown",
+    )
+
+    async for page in recipient_pages(broadcast.audience, broadcast.last_key, settings.BROADCAST_CHUNK_SIZE):
+        results = await asyncio.gather(*(_deliver(bot, chat_id, broadcast.text, semaphore) for chat_id in page))
+        delivered = sum(results)
+        sent += delivered
+        failed += len(results) - delivered
+        processed_here += len(results)
+        await _checkpoint(broadcast, last_key=page[-1], sent=sent, failed=failed)
+
+        now = time.monotonic()
+        if now - last_report >= settings.BROADCAST_REPORT_INTERVAL:
+            last_report = now
+            rate = processed_here / max(now - started, 1e-6)
+            try:
+                await _edit_report(bot, report, _progress_text(broadcast, sent, failed, rate))
+            except Exception:
+                logger.debug("Could not update broadcast progress", exc_info=True)
+
+    await _checkpoint(broadcast, status="done", sent=sent, failed=failed)
+    rate = processed_here / max(time.monotonic() - started, 1e-6)
+    await _edit_report(bot, report, _progress_text(broadcast, sent, failed, rate, done=True))
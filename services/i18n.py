@@ -0,0 +1,151 @@
+"""
+i18n.py
+Handles:
+- Message catalogs compiled once into immutable per-locale tables
+- Keyboards prebuilt per locale and reused
+- User locale cached in memory, persisted through user_data["lang"]
+"""
+
+from collections import OrderedDict
+from types import MappingProxyType
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from config import settings
+
+DEFAULT_LOCALE = "en"
+LOCALE_NAMES = {"en": "🇺🇸 English", "hi": "🇮🇳 Hindi"}
+
+_SOURCE = {
+    "en": {
+        "greeting": "👋 **Hello {name}!**\nWelcome to your bot!",
+        "btn_msg_admin": "💬 Message Admin",
+        "btn_about": "ℹ About Us",
+        "btn_settings": "⚙ Settings",
+        "btn_gateway": "🌐 Add Payment Gateway (Coming Soon)",
+        "btn_back": "🔙 Back to Menu",
+        "about": (
+            "📌 **About This Bot**\n\n"
+            "This bot helps you manage your leads and respond quickly.\n"
+            "💡 Auto reply system\n"
+            "💡 Admin direct inbox system\n"
+            "💡 Free Trial: {trial_months} Months\n\n"
+            "Powered by ConnectsProBot Platform\n"
+            "This Bot was made using @Connectsprobot"
+        ),
+        "settings": (
+            "⚙ **Settings & Controls**\n\n"
+            "Here you will control:\n"
+            "✔ Payments\n"
+            "✔ Subscription Upgrade\n"
+            "✔ Bot Customization\n\n"
+            "This Bot was made using @Connectsprobot"
+        ),
+        "choose_language": "🌐 Choose Language",
+        "language_set": "✅ Language set to English.",
+    },
+    "hi": {
+        "greeting": "👋 **नमस्ते {name}!**\nआपके बॉट में आपका स्वागत है!",
+        "btn_msg_admin": "💬 एडमिन को संदेश भेजें",
+        "btn_about": "ℹ हमारे बारे में",
+        "btn_settings": "⚙ सेटिंग्स",
+        "btn_gateway": "🌐 पेमेंट गेटवे जोड़ें (जल्द आ रहा है)",
+        "btn_back": "🔙 मेनू पर वापस जाएँ",
+        "about": (
+            "📌 **इस बॉट के बारे में**\n\n"
+            "यह बॉट आपको अपने लीड्स संभालने और जल्दी जवाब देने में मदद करता है।\n"
+            "💡 ऑटो रिप्लाई सिस्टम\n"
+            "💡 एडमिन डायरेक्ट इनबॉक्स सिस्टम\n"
+            "💡 फ्री ट्रायल: {trial_months} महीने\n\n"
+            "Powered by ConnectsProBot Platform\n"
+            "This Bot was made using @Connectsprobot"
+        ),
+        "settings": (
+            "⚙ **सेटिंग्स और कंट्रोल**\n\n"
+            "यहाँ आप नियंत्रित करेंगे:\n"
+            "✔ पेमेंट्स\n"
+            "✔ सब्सक्रिप्शन अपग्रेड\n"
+            "✔ बॉट कस्टमाइज़ेशन\n\n"
+            "This Bot was made using @Connectsprobot"
+        ),
+        "choose_language": "🌐 भाषा चुनें",
+        "language_set": "✅ भाषा हिंदी पर सेट कर दी गई है।",
+    },
+}
+
+
+def _compile(source):
+    static = {"trial_months": settings.TRIAL_MONTHS}
+    catalogs = {}
+    for locale, messages in source.items():
+        table = dict(source[DEFAULT_LOCALE])
+        table.update(messages)
+        # Fill in everything known at startup; only per-user fields stay as placeholders
+        for key in ("about",):
+            table[key] = table[key].format(**static)
+        catalogs[locale] = MappingProxyType(table)
+    return MappingProxyType(catalogs)
+
+
+def _build_keyboards(catalogs):
+    language = InlineKeyboardMarkup(
+        [[InlineKeyboardButton(name, callback_data=f"lang_{code}")] for code, name in LOCALE_NAMES.items()]
+    )
+    keyboards = {}
+    for locale, t in catalogs.items():
+        keyboards[locale] = MappingProxyType({
+            "main_menu": InlineKeyboardMarkup([
+                [InlineKeyboardButton(t["btn_msg_admin"], callback_data="msg_admin")],
+                [InlineKeyboardButton(t["btn_about"], callback_data="about")],
+                [InlineKeyboardButton(t["btn_settings"], callback_data="settings")],
+            ]),
+            "settings": InlineKeyboardMarkup([
+                [InlineKeyboardButton(t["btn_gateway"], callback_data="none")],
+                [InlineKeyboardButton(t["btn_back"], callback_data="back_menu")],
+            ]),
+            "language": language,
+        })
+    return MappingProxyType(keyboards)
+
+
+CATALOGS = _compile(_SOURCE)
+KEYBOARDS = _build_keyboards(CATALOGS)
+
+_locales = OrderedDict()   # (bot id, user id) -> locale, bounded LRU; choices are per bot like user_data
+_LOCALE_CACHE_SIZE = 100000
+
+
+def get_locale(bot_id, user_id, user_data=None) -> str:
+    key = (bot_id, user_id)
+    locale = _locales.get(key)
+    if locale is None:
+        locale = (user_data or {}).get("lang", DEFAULT_LOCALE)
+        if locale not in CATALOGS:
+            locale = DEFAULT_LOCALE
+        _remember(key, locale)
+    return locale
+
+
+def set_locale(bot_id, user_id, locale: str, user_data=None):
+    if locale not in CATALOGS:
+        raise ValueError(locale)
+    if user_data is not None:
+        user_data["lang"] = locale
+    _remember((bot_id, user_id), locale)
+
+
+def forget_locale(bot_id, user_id):
+    _locales.pop((bot_id, user_id), None)
+
+
+def _remember(key, locale: str):
+    _locales[key] = locale
+    _locales.move_to_end(key)
+    if len(_locales) > _LOCALE_CACHE_SIZE:
+        _locales.popitem(last=False)
+
+
+def catalog(update, context):
+    """(messages, keyboards) for the user behind ``update``."""
+    locale = get_locale(context.bot.id, update.effective_user.id, context.user_data)
+    return CATALOGS[locale], KEYBOARDS[locale]
@@ -0,0 +1,59 @@
+"""
+inbox.py
+Handles:
+- Conversation rows (last message, unread counter) kept up to date at write time
+- Marking a conversation read
+"""
+
+from sqlalchemy import func, update
+
+from database import session_scope, upsert, Conversation
+
+PREVIEW_LENGTH = 120
+
+
+def media_label(ref) -> str:
+    """``[photo]`` for a ``photo:<file_id>`` media reference."""
+    return f"[{ref.split(':', 1)[0]}]" if ref else ""
+
+
+async def record_messages(db, rows):
+    """Fold a batch of new MessageLog rows into their conversations (same transaction)."""
+    latest = {}
+    for row in rows:
+        if row.get("owner_id") is None:
+            continue
+        key = (row["owner_id"], row["user_id"])
+        entry = latest.get(key)
+        if entry is None:
+            latest[key] = entry = {
+                "owner_id": row["owner_id"], "user_id": row["user_id"], "unread_count": 0,
+                "last_message": None, "last_message_at": None, "awaiting_since": row["timestamp"],
+            }
+        entry["unread_count"] += 1
+        entry["last_message"] = (row.get("message") or media_label(row.get("media_ref")))[:PREVIEW_LENGTH]
+        entry["last_message_at"] = row["timestamp"]
+
+    if not latest:
+        return
+
+    stmt = upsert(Conversation)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Conversation.owner_id, Conversation.user_id],
+        set_={
+            "last_message": stmt.excluded.last_message,
+            "last_message_at": stmt.excluded.last_message_at,
+            "unread_count": Conversation.unread_count + stmt.excluded.unread_count,
+            "awaiting_since": func.coalesce(Conversation.awaiting_since, stmt.excluded.awaiting_since),
+        },
+    )
+    await db.execute(stmt, list(latest.values()))
+
+
+async def mark_read(owner_id: int, user_id: str):
+    async with session_scope() as db:
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.owner_id == owner_id, Conversation.user_id == user_id)
+            .values(unread_count=0)
+        )
@@ -0,0 +1,127 @@
+"""
+media.py
+Handles:
+- Relaying any media between users and owners by file_id (copy_message), never by bytes
+- Collecting media_group_id albums for a short window into one send_media_group
+- Compact media references ("photo:<file_id>") for MessageLog
+"""
+
+import asyncio
+import logging
+
+from telegram import InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo
+
+from config import settings
+from services.outbox import outbox
+
+logger = logging.getLogger(__name__)
+
+FILE_KINDS = ("photo", "video", "animation", "document", "audio", "voice", "video_note", "sticker")
+CAPTIONED_KINDS = {"photo", "video", "animation", "document", "audio", "voice"}
+ALBUM_TYPES = {"photo": InputMediaPhoto, "video": InputMediaVideo, "document": InputMediaDocument,
+               "audio": InputMediaAudio}
+CAPTION_LIMIT = 1024
+ALBUM_LIMIT = 10   # items Telegram accepts in one media group
+
+
+def media_kind(message):
+    for kind in FILE_KINDS:
+        if getattr(message, kind):
+            return kind
+    attachment = message.effective_attachment
+    return type(attachment).__name__.lower() if attachment else None
+
+
+def media_ref(message):
+    """``kind:file_id`` for files, the bare kind (``location``, ``contact``…) otherwise."""
+    kind = media_kind(message)
+    if kind is None:
+        return None
+    if kind in FILE_KINDS:
+        media = getattr(message, kind)
+        return f"{kind}:{(media[-1] if kind == 'photo' else media).file_id}"
+    return kind
+
+
+def caption_with_header(header: str, caption):
+    text = f"{header}\n\n{caption}" if caption else header
+    return text if len(text) <= CAPTION_LIMIT else text[:CAPTION_LIMIT - 1] + "…"
+
+
+async def relay(bot, message, chat_id, header: str, reply_markup=None):
+    """Copy ``message`` to ``chat_id`` in one call; the header goes into the caption where allowed."""
+    kwargs = {"from_chat_id": message.chat_id, "message_id": message.message_id, "reply_markup": reply_markup}
+    if media_kind(message) in CAPTIONED_KINDS:
+        kwargs["caption"] = caption_with_header(header, message.caption)
+    return await outbox.send(bot.copy_message, chat_id, **kwargs)
+
+
+async def relay_album(bot, messages, chat_id, header: str):
+    """Send collected album items as one media group, reusing their file_ids."""
+    media = []
+    for message in messages:
+        kind = media_kind(message)
+        if kind not in ALBUM_TYPES:
+            continue
+        file = message.photo[-1] if kind == "photo" else getattr(message, kind)
+        media.append(ALBUM_TYPES[kind](media=file.file_id))
+    if not media:
+        return None
+    caption = next((m.caption for m in messages if m.caption), None)
+    return await outbox.send(bot.send_media_group, chat_id, media=media[:ALBUM_LIMIT],
+                             caption=caption_with_header(header, caption))
+
+
+class AlbumCollector:
+    """Groups the separate updates of one album; the first part schedules the flush."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._albums = {}   # key -> (kind, list of messages)
+        self._tasks = set()
+
+    @property
+    def pending(self):
+        return len(self._tasks)
+
+    def extend(self, key, message, kind: str) -> bool:
+        """Add a later part of a ``kind`` album that is already collecting. False if none is open.
+
+        Parts beyond ALBUM_LIMIT are claimed but dropped.
+        """
+        album = self._albums.get(key)
+        if album is None or album[0] != kind:
+            return False
+        if len(album[1]) < ALBUM_LIMIT:
+            album[1].append(message)
+        return True
+
+    def open(self, key, message, on_complete, kind: str):
+        """Start collecting; ``on_complete(messages)`` runs once the window has passed."""
+        self._albums[key] = (kind, [message])
+        task = asyncio.create_task(self._complete(key, on_complete))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _complete(self, key, on_complete):
+        try:
+            await asyncio.sleep(self.window)
+        except asyncio.CancelledError:
+            pass   # shutting down: deliver what we have
+        messages = self._albums.pop(key, (None, []))[1]
+        try:
+            await on_complete(messages)
+        except Exception:
+            logger.exception("Relaying album %s failed", key)
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+def album_key(bot, message):
+    return bot.token, message.chat_id, message.media_group_id
+
+
+albums = AlbumCollector(window=settings.ALBUM_WINDOW)
@@ -0,0 +1,106 @@
+"""
+message_buffer.py
+Handles:
+- Write-behind buffering of MessageLog rows
+- Bulk multi-row inserts on size or time thresholds
+- Back-pressure when the queue is full
+- Flush hooks (conversation counters) in the same transaction
+- Final flush on graceful shutdown
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import insert
+
+from config import settings
+from database import get_db, MessageLog
+from services.analytics import record_inbound
+from services.inbox import record_messages
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MessageBuffer:
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int, model=MessageLog, on_flush=()):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.model = model
+        self.on_flush = list(on_flush)   # async hooks(db, rows) run in the insert transaction
+        self._queue = None
+        self._task = None
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def put(self, **row):
+        """Queue a row, waiting while the buffer is full (back-pressure)."""
+        if self._task is None:
+            raise RuntimeError("MessageBuffer is not running")
+        await self._queue.put(row)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch, attempts: int = 3):
+        for attempt in range(1, attempts + 1):
+            try:
+                async for db in get_db():
+                    await db.execute(insert(self.model), batch)
+                    for hook in self.on_flush:
+                        await hook(db, batch)
+                    await db.commit()
+                return
+            except Exception:
+                logger.exception("Flush of %d rows failed (attempt %d/%d)", len(batch), attempt, attempts)
+                await asyncio.sleep(attempt)
+        logger.error("Dropped %d %s rows after %d attempts", len(batch), self.model.__tablename__, attempts)
+
+
+message_buffer = MessageBuffer(
+    batch_size=settings.INGEST_BATCH_SIZE,
+    flush_interval=settings.INGEST_FLUSH_INTERVAL,
+    max_queue=settings.INGEST_QUEUE_SIZE,
+    on_flush=[record_messages, record_inbound],
+)
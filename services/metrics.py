@@ -0,0 +1,224 @@
+"""
+metrics.py
+Handles:
+- In-process counters, gauges and latency histograms (Prometheus text format)
+- Handler / job wrappers: latency, errors and DB queries per update
+- SQLAlchemy engine hooks timing every statement
+- Bot API request latency and 429 counts
+- Small aiohttp endpoint serving /metrics
+"""
+
+import functools
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+_update_queries = ContextVar("update_queries", default=None)   # [count] for the running handler
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = defaultdict(int)   # (name, labels) -> value
+        self.histograms = {}               # (name, labels) -> Histogram
+        self.gauges = {}                   # (name, labels) -> value
+        self._runner = None
+
+    def inc(self, name: str, value: int = 1, **labels):
+        self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def set(self, name: str, value: float, **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def counter_value(self, name: str, **labels) -> int:
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def series(self, name: str):
+        """{labels dict as tuple: Histogram} for one histogram name."""
+        return {labels: h for (n, labels), h in self.histograms.items() if n == name}
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted({n for n, _ in self.counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (n, labels), value in sorted(self.counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        for name in sorted({n for n, _ in self.gauges}):
+            lines.append(f"# TYPE {name} gauge")
+            for (n, labels), value in sorted(self.gauges.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {_num(value)}")
+        for name in sorted({n for n, _ in self.histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in sorted(self.series(name).items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _num(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.total}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, host: str, port: int, extra=None):
+        """Serve /metrics; ``extra`` is called before each scrape to refresh gauges."""
+        from aiohttp import web   # only needed when the endpoint is enabled
+
+        async def handle(request):
+            if extra is not None:
+                extra(self)
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("📈 Metrics on http://%s:%d/metrics", host, port)
+
+    async def stop_server(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def _num(value) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+def instrument_handler(callback, name: str = None):
+    """Record latency, errors and DB queries for one handler callback."""
+    name = name or getattr(callback, "__name__", "handler")
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        queries = [0]
+        token = _update_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            metrics.inc("handler_errors_total", handler=name)
+            raise
+        finally:
+            metrics.observe("handler_latency_seconds", time.perf_counter() - started, handler=name)
+            metrics.observe("db_queries_per_update", queries[0], COUNT_BUCKETS, handler=name)
+            _update_queries.reset(token)
+    return wrapper
+
+
+def instrument_job(callback, name: str = None):
+    """Record run time and failures of a JobQueue callback."""
+    name = name or callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(context):
+        started = time.perf_counter()
+        try:
+            return await callback(context)
+        except Exception:
+            metrics.inc("job_errors_total", job=name)
+            raise
+        finally:
+            metrics.observe("job_duration_seconds", time.perf_counter() - started, job=name)
+    return wrapper
+
+
+def instrument_engine(engine):
+    """Time every statement and count it against the running handler."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        metrics.observe("db_statement_seconds", time.perf_counter() - context._metrics_started,
+                        verb=statement.lstrip().split(None, 1)[0].upper())
+        queries = _update_queries.get()
+        if queries is not None:
+            queries[0] += 1
+
+    def error(exception_context):
+        metrics.inc("db_errors_total")
+
+    event.listen(sync_engine, "before_cursor_execute", before)
+    event.listen(sync_engine, "after_cursor_execute", after)
+    event.listen(sync_engine, "handle_error", error)
+
+
+def observe_telegram_call(method: str, seconds: float, status):
+    metrics.observe("telegram_request_seconds", seconds, method=method)
+    metrics.inc("telegram_requests_total", method=method, status=status)
+    if status == 429:
+        metrics.inc("telegram_throttled_total", method=method)
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest recording latency and status of every Bot API call."""
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, request_data, **timeouts)
+        except Exception:
+            observe_telegram_call(url.rsplit("/", 1)[-1], time.perf_counter() - started, "error")
+            raise
+        observe_telegram_call(url.rsplit("/", 1)[-1], time.perf_counter() - started, code)
+        return code, payload
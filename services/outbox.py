@@ -0,0 +1,212 @@
+"""
+outbox.py
+Handles:
+- One outbound queue for every Telegram send
+- Priority classes: interactive replies before notifications and broadcasts
+- Token bucket per bot (~30 msg/s) and per-chat spacing (1 msg/s)
+- Sends that are not due yet are deferred, never slept on by a worker
+- Retry on RetryAfter, pausing that bot's sends for the flood window
+- Metrics for queue depth, latency and failures
+"""
+
+import asyncio
+import itertools
+import logging
+from collections import defaultdict
+
+from telegram.error import RetryAfter
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+NOTIFICATION = 1
+BROADCAST = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NOTIFICATION: "notification", BROADCAST: "broadcast"}
+
+
+def _bot_token(method):
+    """Token of the bot a bound Bot method belongs to; Telegram's limits are per bot."""
+    return getattr(getattr(method, "__self__", None), "token", None)
+
+
+class Outbox:
+    def __init__(self, global_rate: float, chat_interval: float, workers: int, max_retries: int):
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self.max_retries = max_retries
+        self._queue = None
+        self._tasks = []
+        self._seq = itertools.count()
+        self._buckets = {}     # bot token -> [tokens, last refill, paused until]
+        self._chat_next = {}   # (bot token, chat id) -> earliest loop time for the next send
+        self._deferred = {}    # seq -> (timer handle, item) for sends that are not due yet
+        self._counters = defaultdict(int)
+        self._latency = defaultdict(lambda: [0, 0.0, 0.0])   # priority -> [count, total, max]
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._buckets = {}
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _idle(self):
+        while True:
+            await self._queue.join()
+            if not self._deferred:
+                return
+            await asyncio.sleep(0.05)
+
+    async def stop(self, timeout: float = 10):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._idle(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox stopped with %d sends pending", self._queue.qsize() + len(self._deferred))
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        pending = [item for _, item in self._deferred.values()]
+        for handle, _ in self._deferred.values():
+            handle.cancel()
+        self._deferred.clear()
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for item in pending:
+            future = item[5]
+            if not future.done():
+                future.cancel()
+
+    async def send(self, method, chat_id, *, priority: int = INTERACTIVE, **kwargs):
+        """Queue ``method(chat_id=chat_id, **kwargs)`` and wait for its result.
+
+        ``method`` is a bound Bot call such as ``context.bot.send_message``.
+        """
+        if not self._tasks:
+            return await method(chat_id=chat_id, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put_nowait((priority, next(self._seq), chat_id, method, kwargs, future, loop.time(), 0))
+        self._counters["queued"] += 1
+        return await future
+
+    def metrics(self):
+        queued = defaultdict(int)
+        if self._queue is not None:
+            for item in self._queue._queue:
+                queued[PRIORITY_NAMES[item[0]]] += 1
+        for _, item in self._deferred.values():
+            queued[PRIORITY_NAMES[item[0]]] += 1
+        latency = {
+            PRIORITY_NAMES[p]: {"count": n, "avg": total / n if n else 0.0, "max": worst}
+            for p, (n, total, worst) in self._latency.items()
+        }
+        return {"counters": dict(self._counters), "queued": dict(queued), "latency": latency}
+
+    def _bucket(self, token, now):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            bucket = self._buckets[token] = [float(self.global_rate), now, 0.0]
+        else:
+            bucket[0] = min(float(self.global_rate), bucket[0] + (now - bucket[1]) * self.global_rate)
+            bucket[1] = now
+        return bucket
+
+    def _reserve(self, token, chat_id, now):
+        """Claim the bot's and the chat's next send slot, or return the loop time to try again.
+
+        Runs without awaiting, so the check and the reservation cannot interleave.
+        """
+        key = (token, chat_id)
+        chat_due = self._chat_next.get(key, 0.0)
+        if chat_due > now:
+            return chat_due
+        bucket = self._bucket(token, now)
+        if bucket[2] > now:
+            return bucket[2]
+        if bucket[0] < 1:
+            return now + (1 - bucket[0]) / self.global_rate
+        bucket[0] -= 1
+        self._chat_next[key] = now + self.chat_interval
+        if len(self._chat_next) > 10000:
+            self._chat_next = {k: t for k, t in self._chat_next.items() if t > now}
+        return None
+
+    def _defer(self, item, when):
+        """Put ``item`` back on the queue at ``when`` instead of holding a worker until then."""
+        def requeue():
+            self._deferred.pop(item[1], None)
+            self._queue.put_nowait(item)
+
+        handle = asyncio.get_running_loop().call_at(when, requeue)
+        self._deferred[item[1]] = (handle, item)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            priority, seq, chat_id, method, kwargs, future, queued_at, attempt = item
+            try:
+                if future.cancelled():
+                    continue
+                token = _bot_token(method)
+                retry_at = self._reserve(token, chat_id, loop.time())
+                if retry_at is not None:
+                    self._defer(item, retry_at)
+                    continue
+                try:
+                    result = await method(chat_id=chat_id, **kwargs)
+                except RetryAfter as e:
+                    self._counters["retry_after"] += 1
+                    bucket = self._bucket(token, loop.time())
+                    bucket[2] = max(bucket[2], loop.time() + e.retry_after)
+                    if attempt < self.max_retries:
+                        self._counters["retried"] += 1
+                        self._queue.put_nowait((priority, seq, chat_id, method, kwargs, future, queued_at, attempt + 1))
+                    else:
+                        self._counters["failed"] += 1
+                        if not future.cancelled():
+                            future.set_exception(e)
+                except Exception as e:
+                    self._counters["failed"] += 1
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    self._counters["sent"] += 1
+                    elapsed = loop.time() - queued_at
+                    stats = self._latency[priority]
+                    stats[0] += 1
+                    stats[1] += elapsed
+                    stats[2] = max(stats[2], elapsed)
+                    if not future.cancelled():
+                        future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+
+outbox = Outbox(
+    global_rate=settings.TELEGRAM_GLOBAL_RATE,
+    chat_interval=settings.TELEGRAM_CHAT_INTERVAL,
+    workers=settings.OUTBOX_WORKERS,
+    max_retries=settings.OUTBOX_MAX_RETRIES,
+)
+
+
+async def reply(update, text: str, **kwargs):
+    """Send ``text`` to the update's chat through the outbox."""
+    return await outbox.send(update.get_bot().send_message, update.effective_chat.id, text=text, **kwargs)
+
+
+async def edit(query, text: str, **kwargs):
+    """Edit the message a callback query came from, through the outbox."""
+    message = query.message
+    return await outbox.send(query.get_bot().edit_message_text, message.chat_id,
+                             message_id=message.message_id, text=text, **kwargs)
@@ -0,0 +1,111 @@
+"""
+owner_cache.py
+Handles:
+- Bounded LRU/TTL directory of owners
+- Lookups by telegram id, owner id and deep-link start parameter
+- Invalidation when onboarding writes an owner, locally and on peer workers
+- Background warmup with the most recently active owners
+- Entries are OwnerRef projections, not session-tracked ORM objects
+"""
+
+import time
+from collections import OrderedDict
+
+from config import settings
+from read_models import default_owner, owner_by_id, owner_by_telegram_id, recently_active_owners
+from services.sharding import peers
+from services.trial_index import trial_index
+
+_MISSING = object()
+
+
+class OwnerCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, owner or None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, owner = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return owner
+
+    def put(self, key, owner):
+        self._entries[key] = (time.monotonic() + self.ttl, owner)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def store(self, owner):
+        """Index a freshly loaded owner under every key it can be routed by."""
+        self.put(("tg", owner.telegram_id), owner)
+        self.put(("id", owner.id), owner)
+        self.put(("start", str(owner.id)), owner)
+
+    def invalidate(self, telegram_id: str, owner_id: int = None):
+        cached = self.get(("tg", telegram_id))
+        if owner_id is None and cached not in (_MISSING, None):
+            owner_id = cached.id
+        keys = [("tg", telegram_id), ("default",)]
+        if owner_id is not None:
+            keys += [("id", owner_id), ("start", str(owner_id))]
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def warm(self, limit: int):
+        """Preload the default owner and the owners with the latest conversations."""
+        await self.default_owner()
+        owners = await recently_active_owners(min(limit, self.maxsize // 3))
+        for owner in owners:
+            # Keep entries that requests loaded while the warmup query ran
+            if self.get(("tg", owner.telegram_id)) is _MISSING:
+                self.store(owner)
+        return len(owners)
+
+    async def _load(self, key, loader):
+        owner = self.get(key)
+        if owner is _MISSING:
+            owner = await loader()
+            if owner is not None:
+                self.store(owner)
+            self.put(key, owner)
+        return owner
+
+    async def by_telegram_id(self, telegram_id: str):
+        telegram_id = str(telegram_id)
+        return await self._load(("tg", telegram_id), lambda: owner_by_telegram_id(telegram_id))
+
+    async def by_id(self, owner_id: int):
+        return await self._load(("id", owner_id), lambda: owner_by_id(owner_id))
+
+    async def by_start_param(self, param: str):
+        """Resolve a ``t.me/<bot>?start=<owner id>`` deep-link parameter."""
+        if not param.isdigit():
+            return None
+        return await self._load(("start", param), lambda: owner_by_id(int(param)))
+
+    async def default_owner(self):
+        """Owner that receives messages sent to the main bot without a deep link."""
+        return await self._load(("default",), default_owner)
+
+
+owner_cache = OwnerCache(maxsize=settings.OWNER_CACHE_SIZE, ttl=settings.OWNER_CACHE_TTL)
+
+
+async def owner_saved(owner):
+    """Refresh every owner directory after ``owner`` was committed."""
+    owner_cache.invalidate(owner.telegram_id, owner.id)
+    trial_index.update(owner)
+    await peers.publish("owner_changed", owner_id=owner.id, telegram_id=owner.telegram_id)
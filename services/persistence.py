@@ -0,0 +1,185 @@
+"""
+persistence.py
+Handles:
+- Persisting user_data / chat_data / conversation states in the bot_state table
+- Lazy per-user / per-chat loading on first access (no full dump at startup)
+- Writing only keys whose encoded state changed, coalesced into one upsert per cycle
+- Bounded LRU of the last known stored state per key
+"""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.future import select
+from telegram.ext import BasePersistence, PersistenceInput
+
+import database
+from config import settings
+from database import get_db, upsert, BotState
+
+logger = logging.getLogger(__name__)
+
+_UNKNOWN = object()
+
+
+def encode(data) -> str:
+    return json.dumps(data, separators=(",", ":"), sort_keys=True, default=str)
+
+
+class DatabasePersistence(BasePersistence):
+    def __init__(self, namespace: str = "main", update_interval: float = 60, maxsize: int = None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.namespace = namespace
+        self.maxsize = maxsize or settings.PERSISTENCE_CACHE_SIZE
+        self._known = OrderedDict()  # (scope, key) -> encoded state in the database, or None if absent
+        self._staged = {}        # (scope, key) -> encoded state, or None to delete
+        self._stale = set()      # (scope, key) whose in-memory copy may be outdated
+        self._flush_task = None
+
+    def _scope(self, kind: str) -> str:
+        return f"{self.namespace}:{kind}"
+
+    def _remember(self, scope: str, key: str, encoded):
+        # Evicted keys are only re-read on next refresh or re-written on next change
+        self._known[(scope, key)] = encoded
+        self._known.move_to_end((scope, key))
+        while len(self._known) > self.maxsize:
+            self._known.popitem(last=False)
+
+    # --- Loading ---
+
+    async def _load_one(self, scope: str, key: str):
+        await database.init_db(settings.DATABASE_URL)
+        async for db in get_db():
+            row = (await db.execute(
+                select(BotState.data).where(BotState.scope == scope, BotState.key == key)
+            )).scalar_one_or_none()
+        self._remember(scope, key, row)
+        return json.loads(row) if row is not None else None
+
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str):
+        scope = self._scope(f"conv:{name}")
+        await database.init_db(settings.DATABASE_URL)
+        async for db in get_db():
+            rows = (await db.execute(select(BotState.key, BotState.data).where(BotState.scope == scope))).all()
+        conversations = {}
+        for key, data in rows:
+            self._remember(scope, key, data)
+            conversations[tuple(json.loads(key))] = json.loads(data)
+        return conversations
+
+    async def refresh_user_data(self, user_id: int, user_data):
+        await self._refresh(self._scope("user"), str(user_id), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data):
+        await self._refresh(self._scope("chat"), str(chat_id), chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def _refresh(self, scope: str, key: str, target):
+        if (scope, key) in self._known:
+            self._known.move_to_end((scope, key))
+            return
+        stored = await self._load_one(scope, key)
+        if (scope, key) in self._stale:
+            # Another process owned this key meanwhile; the database copy wins
+            self._stale.discard((scope, key))
+            target.clear()
+            target.update(stored or {})
+        elif stored:
+            for name, value in stored.items():
+                target.setdefault(name, value)
+
+    def forget(self, kind: str, keys):
+        """Reload these keys from the database on next use (sharded workers taking over chats)."""
+        scope = self._scope(kind)
+        for key in keys:
+            self._known.pop((scope, str(key)), None)
+            self._stale.add((scope, str(key)))
+
+    # --- Writing ---
+
+    def _stage(self, scope: str, key: str, encoded):
+        if self._known.get((scope, key), _UNKNOWN) == encoded:
+            self._staged.pop((scope, key), None)
+            return
+        self._staged[(scope, key)] = encoded
+        # update_persistence() calls us for every dirty key in one gather(); flush once they are all staged
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write_staged())
+
+    async def update_user_data(self, user_id: int, data):
+        self._stage(self._scope("user"), str(user_id), encode(data) if data else None)
+
+    async def update_chat_data(self, chat_id: int, data):
+        self._stage(self._scope("chat"), str(chat_id), encode(data) if data else None)
+
+    async def update_conversation(self, name: str, key, new_state):
+        self._stage(self._scope(f"conv:{name}"), encode(list(key)), None if new_state is None else encode(new_state))
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_user_data(self, user_id: int):
+        self._stage(self._scope("user"), str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int):
+        self._stage(self._scope("chat"), str(chat_id), None)
+
+    async def _write_staged(self):
+        staged, self._staged = self._staged, {}
+        if not staged:
+            return
+        rows = [{"scope": s, "key": k, "data": v} for (s, k), v in staged.items() if v is not None]
+        # Skip deletes only for keys known to be absent; an evicted key may still have a row
+        removed = [(s, k) for (s, k), v in staged.items() if v is None and self._known.get((s, k), _UNKNOWN) is not None]
+
+        try:
+            async for db in get_db():
+                if rows:
+                    stmt = upsert(BotState)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[BotState.scope, BotState.key],
+                        set_={"data": stmt.excluded.data},
+                    )
+                    await db.execute(stmt, rows)
+                if removed:
+                    await db.execute(delete(BotState).where(or_(
+                        *(and_(BotState.scope == s, BotState.key == k) for s, k in removed)
+                    )))
+                await db.commit()
+        except Exception:
+            logger.exception("Persisting %d state keys failed; retrying next cycle", len(staged))
+            staged.update(self._staged)
+            self._staged = staged
+            return
+
+        for (scope, key), encoded in staged.items():
+            self._remember(scope, key, encoded)
+
+    async def flush(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write_staged()
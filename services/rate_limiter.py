@@ -0,0 +1,96 @@
+"""
+rate_limiter.py
+Handles:
+- Per-user token buckets with idle-entry eviction (bounded memory)
+- Daily message quotas with pluggable backends
+  - MemoryQuotaBackend: single process
+  - DatabaseQuotaBackend: shared across worker processes via message_quotas
+"""
+
+import time
+from collections import OrderedDict
+
+from sqlalchemy import delete
+
+from database import MessageQuota, get_db, session_scope, upsert
+
+
+class TokenBucketLimiter:
+    def __init__(self, interval: float, burst: int, idle_ttl: float, max_entries: int):
+        self.interval = interval        # seconds to refill one token
+        self.burst = burst              # bucket capacity
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()   # key -> [tokens, last_refill], oldest first
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def allow(self, key) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+        else:
+            tokens = bucket[0] + (now - bucket[1]) / self.interval
+            bucket[0] = min(float(self.burst), tokens)
+            bucket[1] = now
+
+        allowed = bucket[0] >= 1
+        if allowed:
+            bucket[0] -= 1
+        self._buckets[key] = bucket
+        self._evict(now)
+        return allowed
+
+    def _evict(self, now: float):
+        # Entries are kept in last-seen order, so idle ones sit at the front
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if len(self._buckets) > self.max_entries or now - last > self.idle_ttl:
+                del self._buckets[key]
+            else:
+                break
+
+
+class MemoryQuotaBackend:
+    def __init__(self):
+        self._day = None
+        self._counts = {}
+
+    async def hit(self, key: str, day, limit: int) -> bool:
+        if day != self._day:
+            self._day = day
+            self._counts = {}
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        return count <= limit
+
+    async def purge(self, before_day):
+        pass
+
+
+class DatabaseQuotaBackend:
+    async def hit(self, key: str, day, limit: int) -> bool:
+        stmt = upsert(MessageQuota).values(user_id=key, day=day, count=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MessageQuota.user_id, MessageQuota.day],
+            set_={"count": MessageQuota.count + 1},
+        ).returning(MessageQuota.count)
+
+        async with session_scope() as db:
+            count = (await db.execute(stmt)).scalar_one()
+        return count <= limit
+
+    async def purge(self, before_day):
+        async for db in get_db():
+            await db.execute(delete(MessageQuota).where(MessageQuota.day < before_day))
+            await db.commit()
+
+
+def make_quota_backend(name: str):
+    if name == "database":
+        return DatabaseQuotaBackend()
+    if name == "memory":
+        return MemoryQuotaBackend()
+    raise ValueError(f"Unknown rate limit backend: {name}")
@@ -0,0 +1,67 @@
+"""
+search.py
+Handles:
+- Full-text search over an owner's message history
+- PostgreSQL: to_tsvector / websearch_to_tsquery on a GIN expression index
+- SQLite: FTS5 external-content table kept in sync by triggers
+- Ranked, offset-paginated hits with an optional date range
+"""
+
+from sqlalchemy import literal_column, func
+from sqlalchemy.future import select
+from sqlalchemy.sql import column, table
+
+from database import session_scope, MessageLog
+
+# Must match the index expression created in migrations.py exactly
+TS_CONFIG = "simple"
+_message_search = table("message_search", column("rowid"))
+
+
+def search_vector():
+    return func.to_tsvector(literal_column(f"'{TS_CONFIG}'"), MessageLog.message)
+
+
+def fts5_query(text: str) -> str:
+    """Quote every term so user input is matched literally (implicit AND)."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def _ranked(dialect: str, text: str):
+    """(select with rank column, ORDER BY clause) for the current dialect."""
+    columns = (MessageLog.id, MessageLog.user_id, MessageLog.message, MessageLog.timestamp)
+    if dialect == "postgresql":
+        query = func.websearch_to_tsquery(literal_column(f"'{TS_CONFIG}'"), text)
+        rank = func.ts_rank_cd(search_vector(), query)
+        stmt = select(*columns, rank.label("rank")).where(search_vector().op("@@")(query))
+        return stmt, rank.desc()
+
+    fts = literal_column("message_search")
+    rank = func.bm25(fts)
+    stmt = (
+        select(*columns, rank.label("rank"))
+        .select_from(_message_search)
+        .join(MessageLog, MessageLog.id == _message_search.c.rowid)
+        .where(fts.op("MATCH")(fts5_query(text)))
+    )
+    # bm25() is lower for better matches
+    return stmt, rank.asc()
+
+
+async def search_messages(owner_id: int, text: str, since=None, until=None, user_id=None,
+                          offset: int = 0, limit: int = 10):
+    """Best matches first; returns (rows, has_more)."""
+    if not text.strip():
+        return [], False
+    async with session_scope() as db:
+        stmt, order = _ranked(db.bind.dialect.name, text)
+        stmt = stmt.where(MessageLog.owner_id == owner_id)
+        if since is not None:
+            stmt = stmt.where(MessageLog.timestamp >= since)
+        if until is not None:
+            stmt = stmt.where(MessageLog.timestamp < until)
+        if user_id is not None:
+            stmt = stmt.where(MessageLog.user_id == user_id)
+        stmt = stmt.order_by(order, MessageLog.timestamp.desc()).offset(offset).limit(limit + 1)
+        rows = (await db.execute(stmt)).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,356 @@
+"""
+sharding.py
+Handles:
+- Sharded mode: one ingress (poller or webhook listener) feeding N worker processes
+- Stable slot hashing by chat id, so a chat is served by one worker and stays in order
+- Coordinator: spawns and restarts workers, moves slots off dead workers and back on restart
+- Worker side of the local Unix-socket protocol (newline-delimited JSON)
+- Peer events between workers (e.g. a mini-bot removed by the trial job)
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import zlib
+from collections import defaultdict
+
+from telegram import Update
+
+from services.update_processor import chat_key
+
+logger = logging.getLogger(__name__)
+
+MAX_LINE = 4 * 1024 * 1024
+RESTART_DELAY = 1.0
+TOKEN_EVENTS = {"owner_changed", "remove_owner"}   # peer events after which the known bots change
+
+
+def slot_of(key, slots: int) -> int:
+    return zlib.crc32(str(key).encode()) % slots
+
+
+def worker_index():
+    """Index of this worker process, or None when not running sharded."""
+    value = os.environ.get("SHARD_INDEX")
+    return int(value) if value is not None else None
+
+
+def _encode(message) -> bytes:
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+
+class Coordinator:
+    """Ingress side: owns the slot table and the worker processes."""
+
+    def __init__(self, workers: int, slots: int, socket_path: str, worker_argv, load_tokens=None):
+        self.workers = workers
+        self.slots = slots
+        self.socket_path = socket_path
+        self.worker_argv = list(worker_argv)
+        self.home = [slot % workers for slot in range(slots)]
+        self.owner = list(self.home)     # slot -> worker serving it, None if no worker is alive
+        self._writers = {}               # worker -> StreamWriter of its connection
+        self._held = defaultdict(list)   # slot -> messages waiting for a live owner
+        self._moving = {}                # slot -> worker it moves to once the old owner drained
+        self._drains = {}                # drain id -> (old owner, new owner, slots)
+        self._drain_ids = itertools.count(1)
+        self._procs = {}
+        self._tasks = []
+        self._server = None
+        self._stopping = False
+        self._load_tokens = load_tokens   # async () -> bot tokens the webhook listener accepts
+        self.tokens = set()
+        self._reload = None
+
+    # --- Routing ---
+
+    async def route(self, key, token: str, data):
+        slot = slot_of(key, self.slots)
+        message = {"t": "update", "token": token, "update": data}
+        worker = self.owner[slot]
+        if slot in self._moving or worker not in self._writers:
+            self._held[slot].append(message)
+            return
+        writer = self._writers[worker]
+        writer.write(_encode(message))
+        await writer.drain()
+
+    def _send(self, worker, message):
+        writer = self._writers.get(worker)
+        if writer is not None:
+            writer.write(_encode(message))
+
+    def _assign(self, slots, worker):
+        """Hand ``slots`` to ``worker`` and release what was held for them, in order."""
+        if not slots:
+            return
+        if worker is not None:
+            self._send(worker, {"t": "assign", "slots": slots})
+        for slot in slots:
+            self.owner[slot] = worker
+            if worker is None:
+                continue
+            for message in self._held.pop(slot, ()):
+                self._send(worker, message)
+
+    def _live(self):
+        return sorted(self._writers)
+
+    # --- Membership ---
+
+    def _on_join(self, worker):
+        logger.info("🧩 Worker %d joined", worker)
+        orphaned = [s for s in range(self.slots) if self.owner[s] is None or self.owner[s] == worker]
+        self._assign(orphaned, worker)
+
+        # Take back home slots currently served by someone else, after they drain
+        by_owner = defaultdict(list)
+        for slot in range(self.slots):
+            if self.home[slot] == worker and self.owner[slot] != worker and slot not in self._moving:
+                by_owner[self.owner[slot]].append(slot)
+        for previous, slots in by_owner.items():
+            drain_id = next(self._drain_ids)
+            self._drains[drain_id] = (previous, worker, slots)
+            for slot in slots:
+                self._moving[slot] = worker
+            self._send(previous, {"t": "drain", "id": drain_id})
+
+    def _finish_drain(self, drain_id):
+        entry = self._drains.pop(drain_id, None)
+        if entry is None:
+            return
+        previous, target, slots = entry
+        moved = [s for s in slots if self._moving.get(s) == target]
+        for slot in moved:
+            del self._moving[slot]
+        if target not in self._writers:
+            # The new owner died while we waited; keep the slots where they were
+            target = previous if previous in self._writers else None
+        self._assign(moved, target)
+
+    def _on_leave(self, worker):
+        logger.warning("🧩 Worker %d left", worker)
+        # Drains the dead worker owed can complete right away
+        for drain_id, (previous, _, _) in list(self._drains.items()):
+            if previous == worker:
+                self._finish_drain(drain_id)
+        # Moves towards the dead worker are cancelled
+        for drain_id, (previous, target, slots) in list(self._drains.items()):
+            if target == worker:
+                del self._drains[drain_id]
+                for slot in slots:
+                    self._moving.pop(slot, None)
+                self._assign(slots, previous if previous in self._writers else None)
+
+        orphaned = [s for s in range(self.slots) if self.owner[s] == worker]
+        live = self._live()
+        if not live:
+            self._assign(orphaned, None)
+            return
+        spread = defaultdict(list)
+        for n, slot in enumerate(orphaned):
+            spread[live[n % len(live)]].append(slot)
+        for target, slots in spread.items():
+            self._assign(slots, target)
+
+    async def _serve(self, reader, writer):
+        hello = json.loads(await reader.readline() or b"{}")
+        worker = hello.get("worker")
+        if worker is None:
+            writer.close()
+            return
+        self._writers[worker] = writer
+        self._on_join(worker)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message["t"] == "drained":
+                    self._finish_drain(message["id"])
+                elif message["t"] == "event":
+                    if message["event"] in TOKEN_EVENTS:
+                        self.reload_tokens()
+                    for other in self._live():
+                        if other != worker:
+                            self._send(other, message)
+        except (ConnectionError, json.JSONDecodeError):
+            logger.exception("Connection to worker %d failed", worker)
+        finally:
+            if self._writers.get(worker) is writer:
+                del self._writers[worker]
+                self._on_leave(worker)
+            writer.close()
+
+    # --- Known bots ---
+
+    def reload_tokens(self):
+        """Re-read the accepted tokens in the background (owner added, bot removed)."""
+        if self._load_tokens is not None and (self._reload is None or self._reload.done()):
+            self._reload = asyncio.create_task(self._reload_tokens())
+
+    async def _reload_tokens(self):
+        try:
+            self.tokens = set(await self._load_tokens())
+        except Exception:
+            logger.exception("Could not reload bot tokens")
+
+    # --- Processes ---
+
+    async def _supervise(self, index):
+        env = dict(os.environ, SHARD_INDEX=str(index), SHARD_SOCKET=self.socket_path)
+        while not self._stopping:
+            proc = await asyncio.create_subprocess_exec(sys.executable, *self.worker_argv, env=env)
+            self._procs[index] = proc
+            code = await proc.wait()
+            if self._stopping:
+                return
+            logger.error("Worker %d exited with %s; restarting", index, code)
+            await asyncio.sleep(RESTART_DELAY)
+
+    async def start(self):
+        if self._load_tokens is not None:
+            self.tokens = set(await self._load_tokens())
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.socket_path, limit=MAX_LINE)
+        self._tasks = [asyncio.create_task(self._supervise(i)) for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 30):
+        self._stopping = True
+        if self._reload is not None:
+            self._reload.cancel()
+        for proc in self._procs.values():
+            if proc.returncode is None:
+                proc.terminate()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(p.wait() for p in self._procs.values())), timeout)
+        except asyncio.TimeoutError:
+            for proc in self._procs.values():
+                if proc.returncode is None:
+                    proc.kill()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._server.close()
+        await self._server.wait_closed()
+
+    # --- Ingress ---
+
+    async def poll(self, bot, stop: asyncio.Event):
+        """Single long-poller for the main bot."""
+        offset = None
+        try:
+            while not stop.is_set():
+                try:
+                    updates = await bot.get_updates(offset=offset, timeout=30, read_timeout=40,
+                                                    allowed_updates=Update.ALL_TYPES)
+                except Exception:
+                    logger.exception("getUpdates failed")
+                    await asyncio.sleep(1)
+                    continue
+                for update in updates:
+                    await self.route(chat_key(update), bot.token, update.to_dict())
+                    offset = update.update_id + 1
+        finally:
+            if offset is not None:
+                # Confirm what was routed so a restart does not receive it again
+                try:
+                    await bot.get_updates(offset=offset, timeout=0)
+                except Exception:
+                    logger.exception("Could not confirm the last update offset")
+
+    async def serve_webhooks(self, host: str, port: int, secret: str):
+        """Webhook listener for the main bot and every mini-bot (``/bot/{token}``).
+
+        Only tokens in ``self.tokens`` are routed, so unknown paths never reach a worker.
+        """
+        from aiohttp import web
+
+        async def handle(request):
+            if request.headers.get("X-Telegram-Bot-Api-Secret-Token", "") != secret:
+                return web.Response(status=403)
+            if request.match_info["token"] not in self.tokens:
+                return web.Response(status=404)
+            data = await request.json()
+            await self.route(chat_key(Update.de_json(data, None)), request.match_info["token"], data)
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post("/bot/{token}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+class ShardWorker:
+    """Worker side: receives updates for its slots and answers drain requests."""
+
+    def __init__(self, index: int, socket_path: str, slots: int, dispatch, drain, assign):
+        self.index = index
+        self.socket_path = socket_path
+        self.slots = slots
+        self._dispatch = dispatch    # async (token, update dict)
+        self._drain = drain          # async () -> finish in-flight updates and flush state
+        self._assign = assign        # (set of slots) -> forget cached state of those chats
+        self._writer = None
+
+    async def run(self):
+        """Serve until the coordinator goes away."""
+        reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_LINE)
+        self._writer.write(_encode({"t": "hello", "worker": self.index}))
+        peers.attach(self)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                kind = message["t"]
+                if kind == "update":
+                    await self._dispatch(message["token"], message["update"])
+                elif kind == "assign":
+                    self._assign(set(message["slots"]))
+                elif kind == "drain":
+                    await self._drain()
+                    self._writer.write(_encode({"t": "drained", "id": message["id"]}))
+                elif kind == "event":
+                    await peers.deliver(message["event"], message["data"])
+        finally:
+            peers.attach(None)
+            self._writer.close()
+
+    def send(self, message):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(_encode(message))
+
+
+class Peers:
+    """Events fanned out to the other workers; a no-op outside sharded mode."""
+
+    def __init__(self):
+        self._worker = None
+        self._handlers = defaultdict(list)
+
+    def attach(self, worker):
+        self._worker = worker
+
+    def subscribe(self, event: str, handler):
+        self._handlers[event].append(handler)
+
+    async def publish(self, event: str, **data):
+        if self._worker is not None:
+            self._worker.send({"t": "event", "event": event, "data": data})
+
+    async def deliver(self, event: str, data):
+        for handler in self._handlers.get(event, ()):
+            try:
+                await handler(**data)
+            except Exception:
+                logger.exception("Handling peer event %s failed", event)
+
+
+peers = Peers()
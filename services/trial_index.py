@@ -0,0 +1,82 @@
+"""
+trial_index.py
+Handles:
+- In-memory entitlement map (owner telegram id -> expiry)
+- Min-heap of expiry times so expirations pop in order
+- Loading at startup, updates on onboarding / subscription changes
+"""
+
+import heapq
+from datetime import datetime
+
+from sqlalchemy.future import select
+
+from database import Owner, get_db
+
+# Owners on these plans never expire
+UNLIMITED_PLANS = {"free_shared"}
+
+
+def entitlement_expiry(owner):
+    """None means no expiry; datetime.min means not entitled."""
+    if owner.subscribed or owner.subscription_plan in UNLIMITED_PLANS:
+        return None
+    return owner.trial_ends or datetime.min
+
+
+class TrialIndex:
+    def __init__(self):
+        self._entries = {}   # telegram id -> (owner id, expires_at or None)
+        self._heap = []      # (expires_at, telegram id), stale items skipped on pop
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, owner):
+        self.set(owner.telegram_id, owner.id, entitlement_expiry(owner))
+
+    def set(self, telegram_id: str, owner_id: int, expires_at):
+        self._entries[telegram_id] = (owner_id, expires_at)
+        if expires_at is not None and expires_at != datetime.min:
+            heapq.heappush(self._heap, (expires_at, telegram_id))
+
+    def discard(self, telegram_id: str):
+        self._entries.pop(telegram_id, None)
+
+    def is_active(self, telegram_id: str, now=None):
+        """Entitlement check without I/O. Returns None until the index is loaded."""
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return False if self.loaded else None
+        expires_at = entry[1]
+        return expires_at is None or (now or datetime.now()) < expires_at
+
+    def pop_expired(self, now=None):
+        """Yield (owner id, telegram id) for every entitlement that has just run out."""
+        now = now or datetime.now()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, telegram_id = heapq.heappop(self._heap)
+            entry = self._entries.get(telegram_id)
+            if entry is not None and entry[1] == expires_at:
+                yield entry[0], telegram_id
+
+    async def load(self):
+        async for db in get_db():
+            result = await db.execute(
+                select(Owner.id, Owner.telegram_id, Owner.trial_ends, Owner.subscribed, Owner.subscription_plan)
+            )
+            rows = result.all()
+
+        # Entries set while the first load was running are newer than the rows read
+        fresh = {} if self.loaded else self._entries
+        self._entries = {}
+        self._heap = []
+        for row in rows:
+            self.update(row)
+        for telegram_id, (owner_id, expires_at) in fresh.items():
+            self.set(telegram_id, owner_id, expires_at)
+        self.loaded = True
+
+
+trial_index = TrialIndex()
@@ -0,0 +1,62 @@
+"""
+update_processor.py
+Handles:
+- Concurrent processing of updates from different chats
+- Strict ordering of updates within one chat
+"""
+
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+
+def chat_key(update):
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Runs up to ``max_concurrent_updates`` updates at once, one at a time per chat.
+
+    Same-chat updates queue on a per-chat lock in arrival order, so flows kept in
+    ``context.user_data`` (e.g. ``reply_to``) never race. An update takes a
+    concurrency slot only once its chat's turn has come, so a chat with a long
+    backlog cannot occupy the slots other chats need.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chats = {}   # chat id -> [lock, updates holding or waiting]
+
+    async def process_update(self, update, coroutine):
+        # Replaces the base class version, which takes the slot before the chat lock
+        key = chat_key(update) if hasattr(update, "effective_chat") else None
+        if key is None:
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+            return
+
+        entry = self._chats.get(key)
+        if entry is None:
+            entry = self._chats[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    await self.do_process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chats[key]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass